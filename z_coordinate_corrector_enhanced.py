@@ -12,23 +12,49 @@ Complete Z-coordinate correction tool with:
 """
 
 from qgis.PyQt.QtWidgets import *
-from qgis.PyQt.QtCore import Qt, QTimer, QVariant
+from qgis.PyQt.QtCore import Qt, QTimer, QVariant, QThread, QEventLoop
 from qgis.PyQt.QtGui import QColor
 from qgis.gui import QgsProjectionSelectionWidget
 from qgis.core import *
 import os
 import csv
-import re
-import math
 import time
+from array import array
+from bisect import bisect_right
 from datetime import datetime
 from collections import defaultdict
 
 
+# Problem-node severity by Z difference: < 0.1 Minor, < 0.5 Medium, < 1.0 High, else Critical
+SEVERITY_LIMITS = (0.1, 0.5, 1.0)
+SEVERITY_LABELS = ("Minor", "Medium", "High", "Critical")
+
+
 def classFactory(iface):
     return ZCoordinatePlugin(iface)
 
 
+class BackgroundTask(QThread):
+    """Run a function on a worker thread and keep its result or error.
+    
+    The function must only work on plain Python data / QGIS value objects,
+    never on map layers or widgets (those belong to the GUI thread).
+    """
+    
+    def __init__(self, func, *args):
+        super().__init__()
+        self.func = func
+        self.args = args
+        self.result = None
+        self.error = None
+    
+    def run(self):
+        try:
+            self.result = self.func(*self.args)
+        except Exception as e:
+            self.error = e
+
+
 class ZCoordinatePlugin(QDialog):
     def __init__(self, iface):
         super().__init__()
@@ -42,6 +68,7 @@ class ZCoordinatePlugin(QDialog):
         self.correction_history = []
         self.detection_stats = {}
         self.detected_contour_issues = []  # Store detected contour mismatches
+        self.contour_issues_key = None  # contour_scan_key() of the detection run that found them
         
         # Undo system
         self.undo_stack = []  # Stack of correction states
@@ -50,13 +77,43 @@ class ZCoordinatePlugin(QDialog):
         # Layer duplication tracking
         self.duplicated_layers = {}  # {original_layer_id: duplicated_layer_id}
         
+        # Spatial index cache (reused by detection, correction and verification)
+        self.spatial_indexes = {}  # {layer_id: QgsSpatialIndex with stored geometries}
+        self.watched_layers = set()  # layer ids whose dataChanged invalidates the cache
+        self.contour_layer = None  # Contour layer loaded from self.paths['contour']
+        self.contour_mtime = None  # Modification time of the contour file when it was loaded
+        
+        self.last_repaint = 0.0  # time.monotonic() of the last update_progress() repaint
+        self.running_tasks = []  # BackgroundTask threads of the run_all_in_background() call in progress
+        
         # Menu action
         self.action = QAction("Z Corrector Enhanced", iface.mainWindow())
-        self.action.triggered.connect(self.show)
+        self.action.triggered.connect(self.show_dialog)
         iface.addPluginToMenu("Z Tools", self.action)
         iface.addToolBarIcon(self.action)
         
-        self.build_ui()
+        # The widgets are only built the first time the dialog is opened,
+        # so loading the plugin at QGIS startup stays cheap
+        self.ui_built = False
+    
+    def show_dialog(self):
+        """Build the UI on first use, then show the dialog"""
+        if not self.ui_built:
+            self.build_ui()
+            self.ui_built = True
+        self.show()
+    
+    def closeEvent(self, event):
+        """The dialog can't be closed while worker threads are running"""
+        if self.running_tasks:
+            event.ignore()
+        else:
+            super().closeEvent(event)
+    
+    def reject(self):
+        """Escape closes the dialog too: not while worker threads are running"""
+        if not self.running_tasks:
+            super().reject()
     
     def initGui(self):
         """QGIS requires this method"""
@@ -94,9 +151,9 @@ class ZCoordinatePlugin(QDialog):
         main_layout.addWidget(self.status)
         
         # Close button
-        close_btn = QPushButton("Close")
-        close_btn.clicked.connect(self.close)
-        main_layout.addWidget(close_btn)
+        self.close_btn = QPushButton("Close")
+        self.close_btn.clicked.connect(self.close)
+        main_layout.addWidget(self.close_btn)
         
         self.setLayout(main_layout)
         
@@ -125,6 +182,78 @@ class ZCoordinatePlugin(QDialog):
             self.progress_bar.setMaximum(maximum)
             self.progress_bar.setValue(value)
     
+    def update_progress(self, text, value, maximum):
+        """
+        Progress update for long loops: the bar is refreshed and pending UI
+        events processed at most every 50 ms, however often this is called.
+        """
+        now = time.monotonic()
+        if now - self.last_repaint >= 0.05:
+            self.last_repaint = now
+            self.show_progress(True, text, value, maximum)
+            QApplication.processEvents()
+    
+    def run_in_background(self, text, func, *args):
+        """
+        Run func(*args) on a worker thread and wait for it without freezing the UI.
+        
+        A local event loop keeps the dialog repainting (busy progress bar) while
+        the worker runs. The tabs are disabled meanwhile so no other action can
+        modify the data being used, and the dialog can't be closed (closeEvent,
+        reject) while a thread is running. Exceptions are re-raised here.
+        """
+        return self.run_all_in_background(text, [(func, args)])[0]
+    
+    def run_all_in_background(self, text, calls):
+        """
+        Run several [(func, args), ...] calls concurrently on worker threads
+        (at most one per CPU core at a time) and return their results in order.
+        Same UI handling and error rules as run_in_background().
+        """
+        self.show_progress(True, text, 0, len(calls) if len(calls) > 1 else 0)
+        
+        tasks = [BackgroundTask(func, *args) for func, args in calls]
+        pending = list(reversed(tasks))
+        running = []
+        loop = QEventLoop()
+        
+        def start_next():
+            # Start queued tasks up to the core count; quit once all are done
+            while pending and len(running) < max(1, QThread.idealThreadCount()):
+                task = pending.pop()
+                running.append(task)
+                task.finished.connect(lambda task=task: task_finished(task))
+                task.start()
+            if not running:
+                loop.quit()
+        
+        def task_finished(task):
+            running.remove(task)
+            done = len(tasks) - len(pending) - len(running)
+            if len(calls) > 1:
+                self.show_progress(True, f"{text} ({done}/{len(calls)})", done, len(calls))
+            start_next()
+        
+        # Closing the dialog or unloading the plugin mid-run would destroy
+        # running threads: closing is blocked until all of them are done
+        self.running_tasks = tasks
+        self.tabs.setEnabled(False)
+        self.close_btn.setEnabled(False)
+        try:
+            QTimer.singleShot(0, start_next)
+            loop.exec_()
+            for task in tasks:
+                task.wait()
+        finally:
+            self.running_tasks = []
+            self.tabs.setEnabled(True)
+            self.close_btn.setEnabled(True)
+        
+        for task in tasks:
+            if task.error:
+                raise task.error
+        return [task.result for task in tasks]
+    
     def tab_input(self):
         """Input tab with validation"""
         widget = QWidget()
@@ -318,13 +447,13 @@ class ZCoordinatePlugin(QDialog):
         layout.addWidget(self.detect_stats_display)
         
         # Export problem nodes button
-        self.export_nodes_btn = QPushButton("Export Problem Nodes as Point Shapefile")
+        self.export_nodes_btn = QPushButton("Export Problem Nodes as Point Layer")
         self.export_nodes_btn.setMinimumHeight(45)
         self.export_nodes_btn.setStyleSheet("background:#e1f5fe;font-weight:bold")
         self.export_nodes_btn.clicked.connect(self.export_problem_nodes)
         self.export_nodes_btn.setEnabled(False)
         self.export_nodes_btn.setToolTip(
-            "Creates a point shapefile with all detected problem nodes.\n"
+            "Creates a point GeoPackage with all detected problem nodes.\n"
             "Each point includes: coordinates, Z values, layer info.\n"
             "Use this to visualize problems on the map before correction."
         )
@@ -746,29 +875,35 @@ class ZCoordinatePlugin(QDialog):
             return
         
         duplicated = []
+        duplicates = []
         
         for layer in layers:
             # Create duplicate
             duplicate = layer.clone()
             duplicate.setName(f"{layer.name()}_WORKING_COPY")
-            
-            # Add to project
-            QgsProject.instance().addMapLayer(duplicate)
+            duplicates.append(duplicate)
             
             # Track the relationship
             self.duplicated_layers[layer.id()] = duplicate.id()
             
             duplicated.append(duplicate.name())
         
+        # Add all copies to the project at once (one layersAdded signal, one legend update)
+        QgsProject.instance().addMapLayers(duplicates)
+        
         # Refresh layer list
         self.load_layers()
         
-        # Auto-select the duplicated layers
+        # Auto-select the duplicated layers (only them); the summary is
+        # refreshed once afterwards instead of on every selection change
+        self.layer_list.blockSignals(True)
+        self.layer_list.clearSelection()
         for i in range(self.layer_list.count()):
             item = self.layer_list.item(i)
             layer = item.data(Qt.UserRole)
             if layer and layer.name().endswith("_WORKING_COPY"):
                 item.setSelected(True)
+        self.layer_list.blockSignals(False)
         
         self.update_layer_summary()
         
@@ -849,9 +984,10 @@ class ZCoordinatePlugin(QDialog):
             if len(sublayers) > 1:
                 for sublayer in sublayers:
                     if sublayer:
-                        parts = sublayer.split('!!::!!')
-                        if len(parts) >= 2:
-                            layer_name = parts[1]
+                        # "index!!::!!name!!::!!count!!::!!geometry type": only the name is needed
+                        _, separator, rest = sublayer.partition('!!::!!')
+                        if separator:
+                            layer_name = rest.partition('!!::!!')[0]
                             layer_options.append(layer_name)
                 
                 if layer_options:
@@ -879,22 +1015,9 @@ class ZCoordinatePlugin(QDialog):
             self.show_progress(True, "Processing geometries...", 40, 100)
             QApplication.processEvents()
             
-            if not dxf_layer.isValid() or dxf_layer.featureCount() == 0:
+            if not dxf_layer.isValid():
                 raise Exception("The selected DXF layer is empty or invalid.")
             
-            # Filter only line geometries
-            line_features = []
-            for feature in dxf_layer.getFeatures():
-                geom = feature.geometry()
-                if geom and geom.type() == QgsWkbTypes.LineGeometry:
-                    line_features.append(feature)
-            
-            if not line_features:
-                raise Exception("No line geometries found in the DXF file.")
-            
-            self.show_progress(True, f"Found {len(line_features)} line features...", 60, 100)
-            QApplication.processEvents()
-            
             # Create output shapefile path
             base_name = os.path.splitext(os.path.basename(dxf_path))[0]
             output_path = os.path.join(self.paths['output'], f"{base_name}_contours.shp")
@@ -912,30 +1035,36 @@ class ZCoordinatePlugin(QDialog):
                     self.update_status("Conversion cancelled", "warning")
                     return
             
-            self.show_progress(True, "Creating shapefile...", 80, 100)
+            self.show_progress(True, "Creating shapefile...", 0, 0)
             QApplication.processEvents()
             
-            # Write to shapefile
-            fields = dxf_layer.fields()
-            crs = dxf_layer.crs()
+            # Let the QGIS writer filter and copy the line features in one
+            # native pass (no Python loop over the DXF features)
+            options = QgsVectorFileWriter.SaveVectorOptions()
+            options.driverName = "ESRI Shapefile"
+            options.fileEncoding = "UTF-8"
+            options.filterExpression = "geometry_type($geometry) = 'Line'"
+            options.overrideGeometryType = QgsWkbTypes.LineString
             
-            writer = QgsVectorFileWriter(
-                output_path,
-                "UTF-8",
-                fields,
-                QgsWkbTypes.LineString,
-                crs,
-                "ESRI Shapefile"
-            )
+            def report_progress(progress):
+                self.update_progress("Writing line features...", int(progress), 100)
             
-            if writer.hasError() != QgsVectorFileWriter.NoError:
-                raise Exception(f"Error creating shapefile: {writer.errorMessage()}")
+            feedback = QgsFeedback()
+            feedback.progressChanged.connect(report_progress)
+            options.feedback = feedback
             
-            # Write features
-            for feature in line_features:
-                writer.addFeature(feature)
+            error = QgsVectorFileWriter.writeAsVectorFormatV3(
+                dxf_layer, output_path, QgsProject.instance().transformContext(), options
+            )
             
-            del writer  # Flush to disk
+            if error[0] != QgsVectorFileWriter.NoError:
+                raise Exception(f"Error creating shapefile: {error[1]}")
+            
+            # The shapefile header holds the count, no need to scan the file
+            line_count = QgsVectorLayer(output_path, "converted", "ogr").featureCount()
+            if line_count <= 0:
+                QgsVectorFileWriter.deleteShapeFile(output_path)
+                raise Exception("No line geometries found in the DXF file.")
             
             self.show_progress(True, "Conversion complete!", 100, 100)
             QApplication.processEvents()
@@ -945,7 +1074,7 @@ class ZCoordinatePlugin(QDialog):
                 self,
                 "Conversion Successful",
                 f"DXF file converted successfully!\n\nOutput: {os.path.basename(output_path)}\n"
-                f"Features: {len(line_features)}\n\n"
+                f"Features: {line_count}\n\n"
                 "Would you like to load this file as your contour reference?",
                 QMessageBox.Yes | QMessageBox.No
             )
@@ -972,36 +1101,61 @@ class ZCoordinatePlugin(QDialog):
 
     
     def load_layers(self):
-        """Load available line layers into list widget"""
-        self.layer_list.clear()
+        """Load available line layers into list widget.
+        Only layers added to / removed from the project since the last call are changed."""
+        line_layers = {
+            layer.id(): layer for layer in QgsProject.instance().mapLayers().values()
+            if isinstance(layer, QgsVectorLayer) and layer.geometryType() == QgsWkbTypes.LineGeometry
+        }
         
-        count = 0
-        for layer in QgsProject.instance().mapLayers().values():
-            if isinstance(layer, QgsVectorLayer) and layer.geometryType() == QgsWkbTypes.LineGeometry:
+        # Batch the changes: no repaint and no itemSelectionChanged per item
+        self.layer_list.setUpdatesEnabled(False)
+        self.layer_list.blockSignals(True)
+        
+        # Drop items of removed layers (and the placeholder), rename kept ones
+        listed = set()
+        for row in reversed(range(self.layer_list.count())):
+            item = self.layer_list.item(row)
+            layer = line_layers.get(item.data(Qt.UserRole + 1))
+            if layer:
+                item.setText(layer.name())
+                listed.add(layer.id())
+            else:
+                self.layer_list.takeItem(row)
+        
+        for layer_id, layer in line_layers.items():
+            if layer_id not in listed:
                 item = QListWidgetItem(layer.name())
                 item.setData(Qt.UserRole, layer)  # Store layer object
+                item.setData(Qt.UserRole + 1, layer_id)
                 self.layer_list.addItem(item)
-                count += 1
         
-        if count == 0:
+        if not line_layers:
             item = QListWidgetItem("(No line layers found)")
             item.setFlags(Qt.ItemIsEnabled)  # Not selectable
             self.layer_list.addItem(item)
         
+        self.layer_list.blockSignals(False)
+        self.layer_list.setUpdatesEnabled(True)
+        
         self.update_layer_summary()
         self.update_crs_display()  # Update CRS display
     
     def select_all_layers(self):
         """Select all layers in the list"""
+        self.layer_list.blockSignals(True)
         for i in range(self.layer_list.count()):
             item = self.layer_list.item(i)
             if item.flags() & Qt.ItemIsSelectable:
                 item.setSelected(True)
+        self.layer_list.blockSignals(False)
         self.update_layer_summary()
     
     def clear_layer_selection(self):
         """Clear all layer selections"""
+        self.layer_list.blockSignals(True)
         self.layer_list.clearSelection()
+        self.layer_list.blockSignals(False)
         self.update_layer_summary()
     
     def update_layer_summary(self):
@@ -1016,7 +1170,7 @@ class ZCoordinatePlugin(QDialog):
             self.layer_summary.setText(f"✓ 1 layer selected: {selected[0].name()}")
             self.layer_summary.setStyleSheet("padding:5px;background:#e8f5e9;border:1px solid #4CAF50;border-radius:3px;font-size:11px")
         else:
-            names = ", ".join([layer.name() for layer in selected[:3]])
+            names = ", ".join(layer.name() for layer in selected[:3])
             if count > 3:
                 names += f", ... (+{count-3} more)"
             self.layer_summary.setText(f"✓ {count} layers selected: {names}")
@@ -1136,6 +1290,8 @@ class ZCoordinatePlugin(QDialog):
             # Auto-select the new layer if it's a line layer
             layer_was_selected = False
             if new_layer.geometryType() == QgsWkbTypes.LineGeometry:
+                self.layer_list.blockSignals(True)
+                self.layer_list.clearSelection()
                 for i in range(self.layer_list.count()):
                     item = self.layer_list.item(i)
                     layer = item.data(Qt.UserRole)
@@ -1148,6 +1304,7 @@ class ZCoordinatePlugin(QDialog):
                         item.setBackground(QColor("#e8f5e9"))  # Light green
                         layer_was_selected = True
                         break
+                self.layer_list.blockSignals(False)
                 
                 # Update layer summary to show selection
                 self.update_layer_summary()
@@ -1215,15 +1372,17 @@ class ZCoordinatePlugin(QDialog):
         self.update_status("Analyzing nodes across layers...", "processing")
         
         start_time = time.time()
-        total_features = sum(layer.featureCount() for layer in layers)
+        # Counted once: some providers have to scan the whole file for a count
+        feature_counts = [layer.featureCount() for layer in layers]
+        total_features = sum(feature_counts)
         
         # Display layer info
         self.detect_results.append("=" * 70 + "\n")
         self.detect_results.append("ANALYZING MULTIPLE LAYERS\n")
         self.detect_results.append("=" * 70 + "\n\n")
         self.detect_results.append(f"Number of layers: {len(layers)}\n")
-        for i, layer in enumerate(layers, 1):
-            self.detect_results.append(f"  {i}. {layer.name()} ({layer.featureCount()} features)\n")
+        for i, (layer, count) in enumerate(zip(layers, feature_counts), 1):
+            self.detect_results.append(f"  {i}. {layer.name()} ({count} features)\n")
         self.detect_results.append(f"Total features: {total_features}\n\n")
         
         # Phase 1: Insert intersection vertices if requested
@@ -1238,9 +1397,6 @@ class ZCoordinatePlugin(QDialog):
             for layer in layers:
                 intersections_added = self.detect_and_insert_intersections(layer)
                 total_intersections += intersections_added
-                if intersections_added > 0:
-                    layer.commitChanges()
-                    layer.updateExtents()
             
             # Check intersections BETWEEN layers
             for i, layer1 in enumerate(layers):
@@ -1258,50 +1414,98 @@ class ZCoordinatePlugin(QDialog):
         self.detect_results.append("PHASE 2: Z-COORDINATE ANALYSIS (ACROSS ALL LAYERS)\n")
         self.detect_results.append("=" * 70 + "\n\n")
         
-        self.show_progress(True, "Analyzing vertices across layers...", 0, total_features)
+        # Read the vertices of all layers concurrently, one worker per layer.
+        # Workers only see a QgsVectorLayerFeatureSource snapshot of the layer,
+        # which is the thread-safe way to read features outside the GUI thread.
+        # The largest layers are started first so that, when there are more
+        # layers than cores, a big layer is not left running alone at the end.
+        order = sorted(range(len(layers)), key=feature_counts.__getitem__, reverse=True)
+        sources = [QgsVectorLayerFeatureSource(layers[i]) for i in order]
+        results = self.run_all_in_background(
+            "Reading vertices of all layers...",
+            [(self.extract_layer_vertices, (source,)) for source in sources]
+        )
+        layer_vertices = [None] * len(layers)
+        for i, result in zip(order, results):
+            layer_vertices[i] = result
         
-        # Collect all vertices from ALL layers
-        nodes = defaultdict(list)
-        processed = 0
+        self.show_progress(True, "Analyzing vertices across layers...", 0, len(layers))
         
-        for layer in layers:
-            for feat in layer.getFeatures():
-                geom = feat.geometry()
-                if not geom.isEmpty():
-                    coords = self.parse_wkt(geom.asWkt())
-                    for x, y, z in coords:
-                        if abs(z) > 1e-10:
-                            nodes[(x, y)].append({
-                                'layer': layer.name(),
-                                'layer_id': layer.id(),
-                                'fid': feat.id(),
-                                'z': z
-                            })
-                
-                processed += 1
-                if processed % 100 == 0:
-                    self.show_progress(True, f"Analyzing vertices... ({processed}/{total_features})", processed, total_features)
-                    QApplication.processEvents()
-            if processed % 100 == 0:
-                self.show_progress(True, f"Analyzing vertices... ({processed}/{total_features})", processed, total_features)
-                QApplication.processEvents()
+        # Collect all vertices from ALL layers
+        # Vertices are stored column-wise in typed arrays (one row per vertex),
+        # so no Python object is created per vertex. Each (x, y) node keeps the
+        # row of its latest vertex; earlier rows of the same node are chained
+        # through prev_row (-1 ends the chain). Nodes are keyed by complex(x, y):
+        # one exact, packed object per node instead of a tuple of two floats.
+        # Keys are deliberately not snapped to a grid: update_z() locates vertices
+        # by exact XY, so nodes merged by rounding could not be corrected.
+        row_layer = array('H')  # index into layers (2 bytes per vertex)
+        row_fid = array('q')
+        row_z = array('d')
+        prev_row = array('q')
+        nodes = {}  # complex(x, y) -> latest row
+        
+        for layer_index, (fids, xs, ys, zs) in enumerate(layer_vertices):
+            # Only the node chaining needs a Python loop (keys are built by map()
+            # in C); the fid/Z/layer columns are copied array-to-array
+            first_row = len(prev_row)
+            for row, key in enumerate(map(complex, xs, ys), first_row):
+                prev_row.append(nodes.get(key, -1))
+                nodes[key] = row
+            row_fid.extend(fids)
+            row_z.extend(zs)
+            row_layer.extend(array('H', [layer_index]) * len(fids))
+            
+            self.show_progress(True, f"Analyzing vertices... ({layer_index + 1}/{len(layers)} layers)", layer_index + 1, len(layers))
+            QApplication.processEvents()
         
         # Find problems
         self.show_progress(True, "Analyzing Z differences...", 0, 0)
         QApplication.processEvents()
         
+        layer_names = [layer.name() for layer in layers]
+        layer_ids = [layer.id() for layer in layers]
+        
         problems = []
-        for (x, y), entries in nodes.items():
-            if len(entries) > 1:
-                zvals = [e['z'] for e in entries]
-                if len(set(zvals)) > 1:
-                    problems.append({
-                        'x': x, 'y': y,
-                        'entries': entries,
-                        'z_min': min(zvals),
-                        'z_max': max(zvals),
-                        'z_diff': max(zvals) - min(zvals)
-                    })
+        for key, row in nodes.items():
+            # Nodes with a single vertex cannot have a Z difference
+            if prev_row[row] == -1:
+                continue
+            
+            # Reduce the chain to min/max first; most nodes agree on Z, so
+            # the row list is only built for nodes that are reported
+            z_min = z_max = row_z[row]
+            r = prev_row[row]
+            while r != -1:
+                z = row_z[r]
+                if z < z_min:
+                    z_min = z
+                elif z > z_max:
+                    z_max = z
+                r = prev_row[r]
+            
+            if z_max != z_min:
+                rows = []
+                while row != -1:
+                    rows.append(row)
+                    row = prev_row[row]
+                rows.reverse()
+                
+                problems.append({
+                    'x': key.real, 'y': key.imag,
+                    'entries': [
+                        {
+                            'layer': layer_names[row_layer[r]],
+                            'layer_id': layer_ids[row_layer[r]],
+                            'fid': row_fid[r],
+                            'z': row_z[r]
+                        }
+                        for r in rows
+                    ],
+                    'z_min': z_min,
+                    'z_max': z_max,
+                    'z_diff': z_max - z_min
+                })
         
         self.nodes_csv = problems
         elapsed_time = time.time() - start_time
@@ -1320,47 +1524,47 @@ class ZCoordinatePlugin(QDialog):
         self.detect_stats_display.append(f"Problem nodes: {len(problems)}\n")
         self.detect_stats_display.append(f"Detection time: {elapsed_time:.2f}s\n")
         
-        # Show results
-        self.detect_results.append(f"Total nodes analyzed: {len(nodes)}\n")
-        self.detect_results.append(f"Nodes with Z differences: {len(problems)}\n")
-        self.detect_results.append(f"Processing time: {elapsed_time:.2f} seconds\n\n")
+        # Show results (collected first and added to the text box in one append;
+        # appending a line at a time re-lays out the document each time)
+        report = []
+        report.append(f"Total nodes analyzed: {len(nodes)}\n")
+        report.append(f"Nodes with Z differences: {len(problems)}\n")
+        report.append(f"Processing time: {elapsed_time:.2f} seconds\n\n")
         
         if problems:
             # Calculate statistics
             max_diff = max(p['z_diff'] for p in problems)
             avg_diff = sum(p['z_diff'] for p in problems) / len(problems)
             
-            self.detect_results.append(f"Maximum Z difference: {max_diff:.3f}\n")
-            self.detect_results.append(f"Average Z difference: {avg_diff:.3f}\n\n")
+            report.append(f"Maximum Z difference: {max_diff:.3f}\n")
+            report.append(f"Average Z difference: {avg_diff:.3f}\n\n")
             
-            self.detect_results.append("Sample issues (showing first 15):\n")
-            self.detect_results.append("-" * 70 + "\n")
+            report.append("Sample issues (showing first 15):\n")
+            report.append("-" * 70 + "\n")
             for i, p in enumerate(problems[:15], 1):
-                self.detect_results.append(
+                report.append(
                     f"{i:2d}. ({p['x']:.2f}, {p['y']:.2f}): "
                     f"Z range [{p['z_min']:.2f} to {p['z_max']:.2f}] "
                     f"diff={p['z_diff']:.3f}\n"
                 )
             
             if len(problems) > 15:
-                self.detect_results.append(f"\n... and {len(problems) - 15} more issues\n")
+                report.append(f"\n... and {len(problems) - 15} more issues\n")
             
             # Save detailed CSV
             csv_file = os.path.join(
                 self.paths['output'], 
                 f"detected_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
             )
-            with open(csv_file, 'w', newline='') as f:
+            with open(csv_file, 'w', newline='', buffering=1 << 20) as f:
                 writer = csv.writer(f)
                 writer.writerow(['X', 'Y', 'FID', 'Z', 'Z_Min', 'Z_Max', 'Z_Diff'])
-                for p in problems:
-                    for e in p['entries']:
-                        writer.writerow([
-                            p['x'], p['y'], e['fid'], e['z'], 
-                            p['z_min'], p['z_max'], p['z_diff']
-                        ])
+                writer.writerows(
+                    (p['x'], p['y'], e['fid'], e['z'], p['z_min'], p['z_max'], p['z_diff'])
+                    for p in problems for e in p['entries']
+                )
             
-            self.detect_results.append(f"\nDetailed CSV saved: {csv_file}\n")
+            report.append(f"\nDetailed CSV saved: {csv_file}\n")
             
             # Enable correction buttons
             self.correct_internal_btn.setEnabled(True)
@@ -1375,19 +1579,66 @@ class ZCoordinatePlugin(QDialog):
             
             self.update_status(f"⚠ Found {len(problems)} problem nodes - Apply corrections", "warning")
         else:
-            self.detect_results.append("✓ No problems found - All nodes have consistent Z values!\n")
+            report.append("✓ No problems found - All nodes have consistent Z values!\n")
             self.update_status("✓ Perfect data - No corrections needed", "success")
             self.verify_btn.setEnabled(True)
             self.export_btn.setEnabled(True)
         
+        self.detect_results.append("\n".join(report))
+        
         # Enable export nodes button if problems were found
         if self.nodes_csv:
             self.export_nodes_btn.setEnabled(True)
         
         self.show_progress(False)
     
+    def extract_layer_vertices(self, source):
+        """
+        Collect the vertices with non-zero Z of one layer as typed columns
+        (fids, xs, ys, zs). Runs on a worker thread, reads only the feature source.
+        """
+        fids = array('q')
+        xs = array('d')
+        ys = array('d')
+        zs = array('d')
+        
+        request = QgsFeatureRequest().setNoAttributes()
+        for feat in source.getFeatures(request):
+            geom = feat.geometry()
+            if geom.isEmpty():
+                continue
+            
+            fid = feat.id()
+            for part in geom.constParts():
+                # Walk each part in place (constParts() does not copy it); a
+                # part without Z has only Z = 0 vertices, which are skipped anyway
+                if not part.is3D():
+                    continue
+                if isinstance(part, QgsLineString):
+                    z_values = part.zVector()
+                    if z_values and all(abs(z) > 1e-10 for z in z_values):
+                        # Usual case, no Z = 0 or NaN vertex: copy the whole part
+                        # column by column without a Python loop per vertex
+                        fids.extend(array('q', [fid]) * len(z_values))
+                        xs.extend(part.xVector())
+                        ys.extend(part.yVector())
+                        zs.extend(z_values)
+                        continue
+                    vertices = zip(part.xVector(), part.yVector(), z_values)
+                else:
+                    vertices = ((v.x(), v.y(), v.z()) for v in part.vertices())
+                
+                for x, y, z in vertices:
+                    if abs(z) > 1e-10:
+                        fids.append(fid)
+                        xs.append(x)
+                        ys.append(y)
+                        zs.append(z)
+        
+        return fids, xs, ys, zs
+    
     def export_problem_nodes(self):
-        """Export problem nodes as point shapefile for visualization"""
+        """Export problem nodes as point GeoPackage for visualization"""
         if not self.nodes_csv:
             QMessageBox.warning(self, "No Data", "Run detection first")
             return
@@ -1397,12 +1648,12 @@ class ZCoordinatePlugin(QDialog):
             return
         
         self.update_status("Exporting problem nodes...", "processing")
-        self.show_progress(True, "Creating point shapefile...", 0, len(self.nodes_csv))
+        self.show_progress(True, "Creating point layer...", 0, len(self.nodes_csv))
         
         try:
             # Create output filename
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            output_file = os.path.join(self.paths['output'], f"PROBLEM_NODES_{timestamp}.shp")
+            output_file = os.path.join(self.paths['output'], f"PROBLEM_NODES_{timestamp}.gpkg")
             
             # Get CRS from layers
             layers = self.get_selected_layers()
@@ -1420,83 +1671,20 @@ class ZCoordinatePlugin(QDialog):
             fields.append(QgsField("layers", QVariant.String))
             fields.append(QgsField("severity", QVariant.String))
             
-            # Create temporary memory layer first
-            temp_layer = QgsVectorLayer(f"PointZ?crs={crs.authid()}", "temp_nodes", "memory")
-            temp_provider = temp_layer.dataProvider()
-            temp_provider.addAttributes(fields)
-            temp_layer.updateFields()
-            
-            # Add features to memory layer
-            features = []
-            for idx, node in enumerate(self.nodes_csv):
-                x = node['x']
-                y = node['y']
-                z_min = node['z_min']
-                z_max = node['z_max']
-                z_diff = z_max - z_min
-                
-                # Determine severity
-                if z_diff < 0.1:
-                    severity = "Minor"
-                elif z_diff < 0.5:
-                    severity = "Medium"
-                elif z_diff < 1.0:
-                    severity = "High"
-                else:
-                    severity = "Critical"
-                
-                # Get unique layer names
-                layer_names = set(entry.get('layer', 'Unknown') for entry in node['entries'])
-                layers_str = ", ".join(sorted(layer_names))
-                if len(layers_str) > 254:  # Shapefile field limit
-                    layers_str = layers_str[:250] + "..."
-                
-                # Create point geometry
-                point = QgsPoint(x, y, z_min)  # Use minimum Z
-                geom = QgsGeometry(point)
-                
-                # Create feature
-                feat = QgsFeature()
-                feat.setGeometry(geom)
-                feat.setAttributes([
-                    idx + 1,           # node_id
-                    x,                 # x
-                    y,                 # y
-                    z_min,             # z_min
-                    z_max,             # z_max
-                    z_diff,            # z_diff
-                    len(node['entries']),  # count
-                    layers_str,        # layers
-                    severity           # severity
-                ])
-                
-                features.append(feat)
-                
-                if idx % 100 == 0:
-                    self.show_progress(True, f"Creating points... ({idx}/{len(self.nodes_csv)})", 
-                                     idx, len(self.nodes_csv))
-                    QApplication.processEvents()
-            
-            # Add all features at once
-            temp_provider.addFeatures(features)
-            
-            # Write to shapefile using the simpler API
-            error = QgsVectorFileWriter.writeAsVectorFormat(
-                temp_layer,
-                output_file,
-                "UTF-8",
-                crs,
-                "ESRI Shapefile"
+            # Write the GeoPackage on a worker thread so the UI stays responsive.
+            # Features are generated one at a time while writing, never all held in memory.
+            self.run_in_background(
+                "Writing problem nodes layer...",
+                self.write_point_file,
+                output_file, fields, crs, QgsProject.instance().transformContext(),
+                self.problem_node_features(list(self.nodes_csv), fields)
             )
             
-            if error[0] != QgsVectorFileWriter.NoError:
-                raise Exception(f"Error writing shapefile: {error[1]}")
-            
-            # Load the shapefile into QGIS
+            # Load the GeoPackage into QGIS
             point_layer = QgsVectorLayer(output_file, f"Problem Nodes {timestamp}", "ogr")
             
             if not point_layer.isValid():
-                raise Exception("Created shapefile is not valid")
+                raise Exception("Created GeoPackage is not valid")
             
             # Apply categorized styling by severity
             self.style_problem_nodes(point_layer)
@@ -1526,6 +1714,72 @@ class ZCoordinatePlugin(QDialog):
             import traceback
             traceback.print_exc()
     
+    def problem_node_features(self, nodes, fields):
+        """Yield one PointZ feature per problem node (plain data only, safe on a worker thread)"""
+        layer_strings = {}  # set of layer names -> joined string; most nodes share a few sets
+        for idx, node in enumerate(nodes):
+            x = node['x']
+            y = node['y']
+            z_min = node['z_min']
+            z_max = node['z_max']
+            z_diff = node['z_diff']
+            
+            # Determine severity (one bisection instead of an if/elif chain)
+            severity = SEVERITY_LABELS[bisect_right(SEVERITY_LIMITS, z_diff)]
+            
+            # Get unique layer names
+            layer_names = frozenset(entry['layer'] for entry in node['entries'])
+            layers_str = layer_strings.get(layer_names)
+            if layers_str is None:
+                layers_str = layer_strings[layer_names] = ", ".join(sorted(layer_names))
+            
+            # Create feature with the output fields and a point geometry at the minimum Z
+            feat = QgsFeature(fields)
+            feat.setGeometry(QgsGeometry(QgsPoint(x, y, z_min)))
+            feat.setAttributes([
+                idx + 1,           # node_id
+                x,                 # x
+                y,                 # y
+                z_min,             # z_min
+                z_max,             # z_max
+                z_diff,            # z_diff
+                len(node['entries']),  # count
+                layers_str,        # layers
+                severity           # severity
+            ])
+            
+            yield feat
+    
+    def write_point_file(self, output_file, fields, crs, transform_context, features):
+        """
+        Write PointZ features to a new GeoPackage (runs on a worker thread, no layer access).
+        The GPKG driver writes everything in one SQLite transaction and fills
+        the R-tree spatial index once at the end, instead of flushing per feature.
+        """
+        options = QgsVectorFileWriter.SaveVectorOptions()
+        options.driverName = "GPKG"
+        options.layerName = "problem_nodes"
+        
+        writer = QgsVectorFileWriter.create(
+            output_file, fields, QgsWkbTypes.PointZ, crs, transform_context, options
+        )
+        if writer.hasError() != QgsVectorFileWriter.NoError:
+            raise Exception(f"Error writing GeoPackage: {writer.errorMessage()}")
+        
+        # Hand features to the writer in batches: one call per 10,000 features,
+        # while never holding more than one batch in memory
+        batch = []
+        for feat in features:
+            batch.append(feat)
+            if len(batch) == 10000:
+                if not writer.addFeatures(batch, QgsFeatureSink.FastInsert):
+                    raise Exception(f"Error writing GeoPackage: {writer.errorMessage()}")
+                batch = []
+        if batch and not writer.addFeatures(batch, QgsFeatureSink.FastInsert):
+            raise Exception(f"Error writing GeoPackage: {writer.errorMessage()}")
+        
+        del writer  # Flush to disk
+    
     def style_problem_nodes(self, layer):
         """Apply categorized styling to problem nodes layer based on severity"""
         # Define categories with colors
@@ -1556,260 +1810,300 @@ class ZCoordinatePlugin(QDialog):
     def detect_and_insert_intersections(self, layer):
         """Detect line intersections and insert vertices at EXACT crossing points with MINIMUM Z value"""
         tolerance = self.intersection_tolerance.value()
-        features = list(layer.getFeatures())
-        total = len(features)
+        total = layer.featureCount()
         
         self.show_progress(True, "Finding intersections...", 0, total)
         
-        # STEP 1: Find all intersections and collect the changes we need to make
-        # Don't modify geometries yet - just collect what needs to be changed
-        changes_to_apply = []  # List of (fid, new_geometry)
+        # Spatial index of feature bounding boxes (bulk loaded, shared with the
+        # other passes) - lines can only cross if their boxes overlap, so each
+        # line is only tested against its neighbours
+        index = self.get_spatial_index(layer)
         
-        for i, feat1 in enumerate(features):
+        # STEP 1: Find all crossing points on the original geometries.
+        # Don't modify geometries yet - each intersection is computed once.
+        # Features are streamed without attributes, never collected in a list.
+        crossings = defaultdict(list)  # fid -> [(x, y, z), ...]
+        
+        for i, feat1 in enumerate(layer.getFeatures(QgsFeatureRequest().setNoAttributes())):
             fid1 = feat1.id()
             geom1 = feat1.geometry()
+            engine1 = None  # geom1 prepared for repeated tests, created on first candidate
             
-            for j, feat2 in enumerate(features[i+1:], i+1):
-                fid2 = feat2.id()
-                geom2 = feat2.geometry()
-                
-                if geom1.intersects(geom2):
-                    intersection = geom1.intersection(geom2)
-                    
-                    if intersection.type() == QgsWkbTypes.PointGeometry:
-                        points = [intersection.asPoint()] if not intersection.isMultipart() else intersection.asMultiPoint()
-                        
-                        for pt in points:
-                            # Get Z values from both lines at crossing
-                            z1_at_crossing = self.get_z_at_exact_point_on_line(geom1, pt.x(), pt.y())
-                            z2_at_crossing = self.get_z_at_exact_point_on_line(geom2, pt.x(), pt.y())
-                            
-                            # Use MINIMUM Z value
-                            z_min = min(z1_at_crossing, z2_at_crossing)
-                            
-                            # Check if we need to insert vertex on geom1
-                            if not self.vertex_exists(geom1, pt.x(), pt.y(), tolerance):
-                                new_geom1 = self.insert_vertex_at_exact_point(geom1, pt.x(), pt.y(), z_min, tolerance)
-                                if new_geom1:
-                                    changes_to_apply.append((fid1, new_geom1))
-                                    geom1 = new_geom1  # Update for subsequent checks in this loop
-                            
-                            # Check if we need to insert vertex on geom2
-                            if not self.vertex_exists(geom2, pt.x(), pt.y(), tolerance):
-                                new_geom2 = self.insert_vertex_at_exact_point(geom2, pt.x(), pt.y(), z_min, tolerance)
-                                if new_geom2:
-                                    changes_to_apply.append((fid2, new_geom2))
-                                    geom2 = new_geom2  # Update for subsequent checks in this loop
-            
-            if i % 10 == 0:
-                self.show_progress(True, f"Finding intersections... ({i}/{total})", i, total)
-                QApplication.processEvents()
-        
-        # STEP 2: Now apply all the changes
-        # Group changes by FID (a feature might need multiple vertex insertions)
-        if changes_to_apply:
-            self.show_progress(True, "Applying geometry changes...", 0, len(changes_to_apply))
-            
-            layer.startEditing()
-            
-            # Group by FID and use the last geometry change for each feature
-            fid_to_geom = {}
-            for fid, geom in changes_to_apply:
-                fid_to_geom[fid] = geom
-            
-            # Apply changes
-            applied = 0
-            for fid, new_geom in fid_to_geom.items():
-                try:
-                    if layer.changeGeometry(fid, new_geom):
-                        applied += 1
-                except:
-                    # Skip features that can't be changed
-                    pass
+            # Each pair only once: the feature with the lower id tests the other
+            for fid2 in index.intersects(geom1.boundingBox()):
+                if fid2 <= fid1:
+                    continue
+                geom2 = index.geometry(fid2)
                 
-                if applied % 10 == 0:
-                    self.show_progress(True, f"Applying changes... ({applied}/{len(fid_to_geom)})", applied, len(fid_to_geom))
-                    QApplication.processEvents()
+                if engine1 is None:
+                    engine1 = self.prepared_engine(geom1)
+                if engine1.intersects(geom2.constGet()):
+                    for crossing in self.crossing_points(geom1, geom2, engine1):
+                        crossings[fid1].append(crossing)
+                        crossings[fid2].append(crossing)
             
-            return applied
+            self.update_progress(f"Finding intersections... ({i}/{total})", i, total)
         
-        return 0
+        # STEP 2: Insert all crossing vertices of each feature in one go
+        if crossings:
+            self.show_progress(True, "Applying geometry changes...", 0, 0)
+        fid_to_geom = self.insert_crossings(crossings, index.geometry, tolerance)
+        return self.commit_geometry_changes(layer, fid_to_geom)
     
     def detect_intersections_between_layers(self, layer1, layer2):
         """Detect intersections BETWEEN two different layers and insert vertices"""
         tolerance = self.intersection_tolerance.value()
-        features1 = list(layer1.getFeatures())
-        features2 = list(layer2.getFeatures())
+        total = layer1.featureCount()
+        index2 = self.get_spatial_index(layer2)
+        text = f"Finding intersections: {layer1.name()} × {layer2.name()}..."
         
-        self.show_progress(True, f"Finding intersections: {layer1.name()} × {layer2.name()}...", 0, len(features1))
+        self.show_progress(True, text, 0, total)
         
-        # STEP 1: Find all intersections and collect changes
-        changes_layer1 = []  # (fid, new_geometry)
-        changes_layer2 = []  # (fid, new_geometry)
+        # STEP 1: Find all crossing points on the original geometries
+        # (layer1 is streamed without attributes; only the geometries of its
+        # features that cross something are kept for STEP 2)
+        crossings1 = defaultdict(list)  # fid -> [(x, y, z), ...]
+        crossings2 = defaultdict(list)
+        geometries1 = {}  # fid -> geometry, layer1 features that cross something
         
-        for i, feat1 in enumerate(features1):
+        for i, feat1 in enumerate(layer1.getFeatures(QgsFeatureRequest().setNoAttributes())):
             fid1 = feat1.id()
             geom1 = feat1.geometry()
+            engine1 = None  # geom1 prepared for repeated tests, created on first candidate
             
-            for feat2 in features2:
-                fid2 = feat2.id()
-                geom2 = feat2.geometry()
+            # Only layer2 features whose bounding box overlaps this line
+            for fid2 in index2.intersects(geom1.boundingBox()):
+                geom2 = index2.geometry(fid2)
                 
-                if geom1.intersects(geom2):
-                    intersection = geom1.intersection(geom2)
-                    
-                    if intersection.type() == QgsWkbTypes.PointGeometry:
-                        points = [intersection.asPoint()] if not intersection.isMultipart() else intersection.asMultiPoint()
-                        
-                        for pt in points:
-                            # Get Z from both lines at crossing
-                            z1_at_crossing = self.get_z_at_exact_point_on_line(geom1, pt.x(), pt.y())
-                            z2_at_crossing = self.get_z_at_exact_point_on_line(geom2, pt.x(), pt.y())
-                            
-                            # Use MINIMUM Z value
-                            z_min = min(z1_at_crossing, z2_at_crossing)
-                            
-                            # Check if we need to insert vertex on geom1
-                            if not self.vertex_exists(geom1, pt.x(), pt.y(), tolerance):
-                                new_geom1 = self.insert_vertex_at_exact_point(geom1, pt.x(), pt.y(), z_min, tolerance)
-                                if new_geom1:
-                                    changes_layer1.append((fid1, new_geom1))
-                                    geom1 = new_geom1
-                            
-                            # Check if we need to insert vertex on geom2
-                            if not self.vertex_exists(geom2, pt.x(), pt.y(), tolerance):
-                                new_geom2 = self.insert_vertex_at_exact_point(geom2, pt.x(), pt.y(), z_min, tolerance)
-                                if new_geom2:
-                                    changes_layer2.append((fid2, new_geom2))
-                                    geom2 = new_geom2
-            
-            if i % 10 == 0:
-                self.show_progress(True, f"Finding intersections: {layer1.name()} × {layer2.name()}... ({i}/{len(features1)})", i, len(features1))
-                QApplication.processEvents()
-        
-        # STEP 2: Apply all changes
-        total_applied = 0
-        
-        if changes_layer1:
-            layer1.startEditing()
-            fid_to_geom = {}
-            for fid, geom in changes_layer1:
-                fid_to_geom[fid] = geom
+                if engine1 is None:
+                    engine1 = self.prepared_engine(geom1)
+                if engine1.intersects(geom2.constGet()):
+                    for crossing in self.crossing_points(geom1, geom2, engine1):
+                        crossings1[fid1].append(crossing)
+                        crossings2[fid2].append(crossing)
             
-            for fid, new_geom in fid_to_geom.items():
-                try:
-                    if layer1.changeGeometry(fid, new_geom):
-                        total_applied += 1
-                except:
-                    pass
+            if fid1 in crossings1:
+                geometries1[fid1] = geom1
             
-            layer1.commitChanges()
-        
-        if changes_layer2:
-            layer2.startEditing()
-            fid_to_geom = {}
-            for fid, geom in changes_layer2:
-                fid_to_geom[fid] = geom
-            
-            for fid, new_geom in fid_to_geom.items():
-                try:
-                    if layer2.changeGeometry(fid, new_geom):
-                        total_applied += 1
-                except:
-                    pass
-            
-            layer2.commitChanges()
+            self.update_progress(f"{text} ({i}/{total})", i, total)
         
+        # STEP 2: Insert all crossing vertices of each feature in one go and apply
+        total_applied = self.commit_geometry_changes(
+            layer1, self.insert_crossings(crossings1, geometries1.get, tolerance)
+        )
+        total_applied += self.commit_geometry_changes(
+            layer2, self.insert_crossings(crossings2, index2.geometry, tolerance)
+        )
         return total_applied
     
-    def vertex_exists(self, geom, x, y, tolerance):
-        """Check if vertex exists at location"""
-        for vx, vy, _ in self.parse_wkt(geom.asWkt()):
-            if abs(vx - x) < tolerance and abs(vy - y) < tolerance:
-                return True
-        return False
-    
-    def insert_vertex_at_exact_point(self, geom, exact_x, exact_y, z_value, tolerance):
-        """Insert vertex at EXACT crossing point (no interpolation of XY coordinates)"""
-        coords = self.parse_wkt(geom.asWkt())
-        new_coords = []
-        vertex_inserted = False
-        
-        for i in range(len(coords) - 1):
-            p1 = coords[i]
-            p2 = coords[i + 1]
-            
-            # Add first point of segment
-            new_coords.append(p1)
-            
-            # Check if the EXACT point lies on this segment
-            if self.point_on_segment(exact_x, exact_y, p1[0], p1[1], p2[0], p2[1], tolerance):
-                # Insert vertex at EXACT XY coordinates with specified Z
-                new_coords.append((exact_x, exact_y, z_value))
-                vertex_inserted = True
-        
-        # Add last point
-        new_coords.append(coords[-1])
-        
-        # Only return new geometry if we actually added a vertex
-        if vertex_inserted and len(new_coords) > len(coords):
-            coord_str = ", ".join([f"{c[0]} {c[1]} {c[2]}" for c in new_coords])
-            wkt = geom.asWkt()
-            if "MULTI" in wkt.upper():
-                new_wkt = f"MULTILINESTRING Z (({coord_str}))"
-            else:
-                new_wkt = f"LINESTRING Z ({coord_str})"
-            return QgsGeometry.fromWkt(new_wkt)
-        
-        return None
+    def prepared_engine(self, geom):
+        """
+        GEOS engine for geom with the geometry prepared: repeated intersects()
+        tests against many candidates reuse its internal index instead of
+        re-examining every segment of geom each time, and intersection() calls
+        reuse its GEOS copy of geom instead of converting geom again.
+        """
+        engine = QgsGeometry.createGeometryEngine(geom.constGet())
+        engine.prepareGeometry()
+        return engine
     
-    def point_on_segment(self, px, py, x1, y1, x2, y2, tolerance):
+    def worker_candidates(self, index1, fids1, index2):
         """
-        Check if point is on line segment.
-        Handles zero-length segments and zero tolerance properly.
+        [(fid1, geometry, [(fid2, geometry), ...]), ...]: each line fids1 of
+        index1 with the lines of index2 whose bounding box overlaps it. The
+        index queries run here, on the GUI thread; the geometries are deep
+        copies made for this list only (each line of index2 copied once), so
+        one worker thread can use them without sharing anything with others.
         """
-        # Vector from p1 to p2
-        dx = x2 - x1
-        dy = y2 - y1
-        
-        # Vector from p1 to point
-        dpx = px - x1
-        dpy = py - y1
-        
-        # Length squared
-        len_sq = dx * dx + dy * dy
-        
-        # CRITICAL: Prevent division by zero
-        # Check if segment has zero or near-zero length (p1 == p2 or nearly identical)
-        if len_sq == 0.0:
-            # Zero-length segment: point must be at same location
-            if tolerance == 0:
-                return dpx == 0.0 and dpy == 0.0
-            else:
-                dist_sq = dpx * dpx + dpy * dpy
-                return dist_sq <= tolerance * tolerance
-        
-        # Parameter t
-        t = (dpx * dx + dpy * dy) / len_sq
-        
-        # Check if point projects onto segment
-        if t < 0 or t > 1:
-            return False
-        
-        # Closest point on segment
-        closest_x = x1 + t * dx
-        closest_y = y1 + t * dy
-        
-        # Distance from point to closest point
-        dist_x = px - closest_x
-        dist_y = py - closest_y
-        dist_sq = dist_x * dist_x + dist_y * dist_y
-        
-        # Handle zero tolerance (exact matching)
-        if tolerance == 0:
-            return dist_sq == 0.0
-        else:
-            return dist_sq <= tolerance * tolerance
+        copies2 = {}  # fid2 -> copy of its geometry
+        candidates = []
+        for fid1 in fids1:
+            geom1 = index1.geometry(fid1)
+            if geom1.isEmpty():
+                continue
+            pairs = []
+            for fid2 in index2.intersects(geom1.boundingBox()):
+                geom2 = copies2.get(fid2)
+                if geom2 is None:
+                    geom2 = index2.geometry(fid2)
+                    if geom2.isEmpty():
+                        continue
+                    geom2 = copies2[fid2] = QgsGeometry(geom2.constGet().clone())
+                pairs.append((fid2, geom2))
+            candidates.append((fid1, QgsGeometry(geom1.constGet().clone()), pairs))
+        return candidates
+    
+    def crossing_points(self, geom1, geom2, engine1):
+        """
+        (x, y, z) of each point where two intersecting lines cross, at the
+        EXACT crossing XY with the MINIMUM of the Z both lines have there.
+        """
+        intersection = QgsGeometry(engine1.intersection(geom2.constGet()))
+        if intersection.type() != QgsWkbTypes.PointGeometry:
+            return []
+        
+        points = [intersection.asPoint()] if not intersection.isMultipart() else intersection.asMultiPoint()
+        result = []
+        for pt in points:
+            # Get Z values from both lines at crossing
+            z1_at_crossing = self.get_z_at_exact_point_on_line(geom1, pt.x(), pt.y())
+            z2_at_crossing = self.get_z_at_exact_point_on_line(geom2, pt.x(), pt.y())
+            
+            # Use MINIMUM Z value
+            result.append((pt.x(), pt.y(), min(z1_at_crossing, z2_at_crossing)))
+        return result
+    
+    def insert_crossings(self, crossings, get_geometry, tolerance):
+        """
+        Insert the crossing vertices {fid: [(x, y, z), ...]} into the original
+        geometries (get_geometry(fid)). Returns {fid: new geometry} of the
+        features that received at least one vertex.
+        """
+        changes = {}
+        for fid, points in crossings.items():
+            # One vertex per crossing XY; where several lines cross at the same
+            # point the MINIMUM Z of all of them is used
+            targets = {}
+            for x, y, z in points:
+                key = complex(x, y)
+                if key not in targets or z < targets[key]:
+                    targets[key] = z
+            
+            new_geom = self.insert_vertices_at_points(get_geometry(fid), targets, tolerance)
+            if new_geom:
+                changes[fid] = new_geom
+        return changes
+    
+    def commit_geometry_changes(self, layer, changes):
+        """Write {fid: geometry} changes to a layer.
+        Returns the number of features changed."""
+        if not changes:
+            return 0
+        
+        # Through the layer's edit buffer, as one edit command, so QGIS's own
+        # undo stack keeps the change
+        layer.startEditing()
+        layer.beginEditCommand("Z-coordinate correction")
+        applied = 0
+        for fid, geom in changes.items():
+            if layer.changeGeometry(fid, geom):
+                applied += 1
+        layer.endEditCommand()
+        layer.commitChanges()
+        layer.updateExtents()
+        self.invalidate_spatial_index(layer.id())
+        return applied
+    
+    def fetch_geometries(self, layer, fids):
+        """Read the geometries of the given features in one request. Returns {fid: geometry}.
+        If the layer's spatial index is cached, its stored geometries are used instead."""
+        index = self.spatial_indexes.get(layer.id())
+        if index is not None:
+            geometries = {fid: index.geometry(fid) for fid in fids}
+            return {fid: geom for fid, geom in geometries.items() if not geom.isNull()}
+        
+        request = QgsFeatureRequest().setFilterFids(list(fids)).setNoAttributes()
+        return {feat.id(): feat.geometry() for feat in layer.getFeatures(request)}
+    
+    def get_spatial_index(self, layer):
+        """Return a cached spatial index of the layer (built on first use).
+        The index also stores feature geometries: index.geometry(fid)."""
+        layer_id = layer.id()
+        index = self.spatial_indexes.get(layer_id)
+        if index is None:
+            features = layer.getFeatures(QgsFeatureRequest().setNoAttributes())
+            index = QgsSpatialIndex(features, None, QgsSpatialIndex.FlagStoreFeatureGeometries)
+            self.spatial_indexes[layer_id] = index
+            self.watch_layer(layer)
+        return index
+    
+    def watch_layer(self, layer):
+        """Edits made outside the plugin must not leave stale cached data behind"""
+        layer_id = layer.id()
+        if layer_id not in self.watched_layers:
+            self.watched_layers.add(layer_id)
+            layer.dataChanged.connect(lambda: self.invalidate_spatial_index(layer_id))
+    
+    def invalidate_spatial_index(self, layer_id):
+        """Drop the cached spatial index of a layer after its geometries changed,
+        and the detected contour mismatches if they were found on that layer"""
+        self.spatial_indexes.pop(layer_id, None)
+        if self.contour_issues_key and layer_id in self.contour_issues_key[0]:
+            self.detected_contour_issues = []
+            self.contour_issues_key = None
+    
+    def contour_scan_key(self, layers):
+        """Identify a contour scan: the checked layers and the contour file version"""
+        return tuple(layer.id() for layer in layers), self.paths['contour'], self.contour_mtime
+    
+    def get_contour_layer(self):
+        """Return the contour layer for the selected contour file, loading it only
+        once (again if the file was rewritten since, so its index is rebuilt)"""
+        path = self.paths['contour']
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        if self.contour_layer is None or self.contour_layer.source() != path or self.contour_mtime != mtime:
+            if self.contour_layer is not None:
+                self.invalidate_spatial_index(self.contour_layer.id())
+            self.contour_layer = QgsVectorLayer(path, "contour", "ogr")
+            self.contour_mtime = mtime
+        return self.contour_layer
+    
+    def insert_vertices_at_points(self, geom, targets, tolerance):
+        """
+        Insert a vertex at each EXACT point of targets {complex(x, y): z} that lies on a
+        segment of the line and is not a vertex yet. Returns the new geometry,
+        or None if nothing was inserted.
+        """
+        # (vertex number to insert before, position along the segment, x, y, z)
+        insertions = []
+        for key, z in targets.items():
+            x, y = key.real, key.imag
+            segment = self.closest_segment(geom, x, y, tolerance)
+            if segment is None:
+                continue
+            after_vertex, (x1, y1, _), (x2, y2, _) = segment
+            if self.is_same_point(x, y, x1, y1, tolerance) or self.is_same_point(x, y, x2, y2, tolerance):
+                continue  # Vertex already exists
+            insertions.append((after_vertex, self.get_segment_parameter(x, y, x1, y1, x2, y2), x, y, z))
+        if not insertions:
+            return None
+        
+        # Insert in place on a copy of the geometry: parts and their order are
+        # kept, and nothing is formatted to WKT and parsed back. Inserting from
+        # the end of the line backwards keeps the vertex numbers of the
+        # remaining insertions valid.
+        new_geom = QgsGeometry(geom)
+        if not new_geom.constGet().is3D():
+            new_geom.get().addZValue(0)
+        for after_vertex, _, x, y, z in sorted(insertions, reverse=True):
+            # Insert vertex at EXACT XY coordinates with specified Z
+            new_geom.insertVertex(QgsPoint(x, y, z), after_vertex)
+        
+        return new_geom
+    
+    def closest_segment(self, geom, x, y, tolerance):
+        """
+        Find the segment the point lies on (within tolerance) with QGIS's native
+        closestSegmentWithContext(), which never joins the end of one part to
+        the start of the next. Returns (vertex number after the segment,
+        (x1, y1, z1), (x2, y2, z2)), or None if the point is off the line.
+        """
+        max_sq_dist = tolerance * tolerance
+        # epsilon: distances below it count as 0, so it must not exceed the tolerance
+        sq_dist, _, after_vertex, _ = geom.closestSegmentWithContext(QgsPointXY(x, y), max_sq_dist)
+        if sq_dist < 0 or sq_dist > max_sq_dist:
+            return None
+        
+        is_3d = geom.constGet().is3D()
+        v1 = geom.vertexAt(after_vertex - 1)
+        v2 = geom.vertexAt(after_vertex)
+        return (after_vertex,
+                (v1.x(), v1.y(), v1.z() if is_3d else 0.0),
+                (v2.x(), v2.y(), v2.z() if is_3d else 0.0))
+    
+    def is_same_point(self, x1, y1, x2, y2, tolerance):
+        """Check if two points are within tolerance in X and in Y"""
+        return abs(x1 - x2) < tolerance and abs(y1 - y2) < tolerance
     
     def get_segment_parameter(self, px, py, x1, y1, x2, y2):
         """Get parameter t for point projection on segment"""
@@ -1837,38 +2131,31 @@ class ZCoordinatePlugin(QDialog):
         
         Then we take MINIMUM of Z from both lines.
         """
-        coords = self.parse_wkt(geom.asWkt())
+        segment = self.closest_segment(geom, exact_x, exact_y, tolerance)
+        if segment is None:
+            return 0.0
+        _, (x1, y1, z1), (x2, y2, z2) = segment
         
         # Check if point is exactly on an existing vertex
-        for x, y, z in coords:
-            if abs(x - exact_x) < tolerance and abs(y - exact_y) < tolerance:
-                return z
-        
-        # Point is between vertices - find which segment and calculate Z at that point
-        for i in range(len(coords) - 1):
-            p1 = coords[i]
-            p2 = coords[i + 1]
-            
-            if self.point_on_segment(exact_x, exact_y, p1[0], p1[1], p2[0], p2[1], tolerance):
-                # Point is on this segment
-                # Calculate where along the segment (0 to 1)
-                t = self.get_segment_parameter(exact_x, exact_y, p1[0], p1[1], p2[0], p2[1])
-                
-                # Calculate Z at this position
-                # (This finds what Z value the line implies at this XY location)
-                z_at_point = p1[2] + t * (p2[2] - p1[2])
-                return z_at_point
+        if self.is_same_point(exact_x, exact_y, x1, y1, tolerance):
+            return z1
+        if self.is_same_point(exact_x, exact_y, x2, y2, tolerance):
+            return z2
         
-        return 0.0
+        # Point is between vertices: calculate where along the segment (0 to 1)
+        # and the Z the line implies at this XY location
+        t = self.get_segment_parameter(exact_x, exact_y, x1, y1, x2, y2)
+        return z1 + t * (z2 - z1)
     
     # ========== CORRECTION ==========
     
     # ========== UNDO SYSTEM ==========
     
-    def save_undo_state(self, correction_type, affected_layers):
+    def save_undo_state(self, correction_type, layer_geometries):
         """
         Save current state before making corrections.
-        Stores geometry snapshots of affected features.
+        layer_geometries: [(layer, {fid: original geometry}), ...] holding only
+        the features the correction is about to modify, not whole layers.
         """
         undo_entry = {
             'type': correction_type,
@@ -1876,19 +2163,14 @@ class ZCoordinatePlugin(QDialog):
             'layers': []
         }
         
-        for layer in affected_layers:
-            layer_state = {
+        # Geometries are kept as WKB: compact binary blobs instead of live
+        # geometry objects, restored without any text parsing
+        for layer, geometries in layer_geometries:
+            undo_entry['layers'].append({
                 'layer_id': layer.id(),
                 'layer_name': layer.name(),
-                'features': {}
-            }
-            
-            # Get all features that will be modified
-            for feat in layer.getFeatures():
-                # Store original geometry as WKT
-                layer_state['features'][feat.id()] = feat.geometry().asWkt()
-            
-            undo_entry['layers'].append(layer_state)
+                'features': {fid: geom.asWkb() for fid, geom in geometries.items()}
+            })
         
         # Add to stack
         self.undo_stack.append(undo_entry)
@@ -1914,25 +2196,21 @@ class ZCoordinatePlugin(QDialog):
         self.show_progress(True, "Restoring geometries...", 0, 0)
         
         restored_count = 0
+        project_layers = QgsProject.instance().mapLayers()
         
         for layer_state in undo_entry['layers']:
-            layer = QgsProject.instance().mapLayer(layer_state['layer_id'])
+            layer = project_layers.get(layer_state['layer_id'])
             
             if not layer:
                 print(f"WARNING: Layer {layer_state['layer_name']} not found")
                 continue
             
-            layer.startEditing()
-            
-            for fid, wkt in layer_state['features'].items():
-                feat = layer.getFeature(fid)
-                if feat.isValid():
-                    restored_geom = QgsGeometry.fromWkt(wkt)
-                    layer.changeGeometry(fid, restored_geom)
-                    restored_count += 1
-            
-            layer.commitChanges()
-            layer.updateExtents()
+            geometries = {}
+            for fid, wkb in layer_state['features'].items():
+                geom = QgsGeometry()
+                geom.fromWkb(wkb)
+                geometries[fid] = geom
+            restored_count += self.commit_geometry_changes(layer, geometries)
         
         self.show_progress(False)
         self.update_status(f"✓ Undone - Restored {restored_count} features", "success")
@@ -1970,6 +2248,17 @@ class ZCoordinatePlugin(QDialog):
     
     # ========== CORRECTIONS ==========
     
+    def internal_target_z(self, node):
+        """Target Z of an internal correction and the rule used: (z, rule)"""
+        z_min = node['z_min']  # MINIMUM Z at this node
+        z_max = node['z_max']  # MAXIMUM Z at this node
+        
+        # SMART Z SELECTION: If minimum is 0, use maximum instead
+        # (Z=0 often indicates missing/error data)
+        if z_min == 0.0 and z_max != 0.0:
+            return z_max, "Z=MAX (min was 0)"
+        return z_min, "Z=MIN"
+    
     def apply_internal(self):
         """
         Apply internal corrections (Z = MINIMUM AT EACH NODE) across ALL layers.
@@ -1989,45 +2278,43 @@ class ZCoordinatePlugin(QDialog):
         self.correct_results.append("Z = MINIMUM AT EACH NODE\n")
         self.correct_results.append("=" * 70 + "\n\n")
         
-        # Get all layers that will be affected
-        affected_layers = []
+        # Get all layers and features that will be affected (one project snapshot, one lookup per layer)
+        project_layers = QgsProject.instance().mapLayers()
+        layer_fids = defaultdict(set)  # layer_id -> fids whose Z will change
         for node in self.nodes_csv:
+            target_z = self.internal_target_z(node)[0]
             for entry in node['entries']:
-                layer_id = entry['layer_id']
-                layer = QgsProject.instance().mapLayer(layer_id)
-                if layer and layer not in affected_layers:
-                    affected_layers.append(layer)
+                if entry['z'] != target_z:
+                    layer_fids[entry['layer_id']].add(entry['fid'])
+        affected_layers = [project_layers[layer_id] for layer_id in layer_fids if layer_id in project_layers]
         
-        # Save undo state BEFORE making any changes
-        self.save_undo_state('internal', affected_layers)
+        # Read all touched features with one request per layer
+        stored_geometries = {
+            layer.id(): self.fetch_geometries(layer, layer_fids[layer.id()]) for layer in affected_layers
+        }
+        
+        # Save undo state BEFORE making any changes (modified features only)
+        self.save_undo_state('internal', [(layer, stored_geometries[layer.id()]) for layer in affected_layers])
         self.correct_results.append("✓ Undo state saved\n\n")
         
         self.update_status("Applying internal corrections across all layers...", "processing")
         self.show_progress(True, "Correcting vertices...", 0, len(self.nodes_csv))
         
-        # Group layers that need editing
-        layers_to_edit = {}  # layer_id -> layer object
+        # Layers that need editing, looked up once (no project lookup in the loop)
+        layers_to_edit = {layer.id(): layer for layer in affected_layers}
         layer_corrections = defaultdict(int)  # layer_id -> count
+        z_updates = defaultdict(lambda: defaultdict(dict))  # layer_id -> {fid: {complex(x, y): target Z}}
         
         count = 0
         corrections = []
-        layers_affected = set()
         nodes_used_max = 0  # Track nodes where max was used instead of min
         
         for idx, node in enumerate(self.nodes_csv):
             x, y = node['x'], node['y']
-            z_min = node['z_min']  # MINIMUM Z at this node
-            z_max = node['z_max']  # MAXIMUM Z at this node
-            
-            # SMART Z SELECTION: If minimum is 0, use maximum instead
-            # (Z=0 often indicates missing/error data)
-            if z_min == 0.0 and z_max != 0.0:
-                target_z = z_max
-                correction_rule = "Z=MAX (min was 0)"
+            key = complex(x, y)
+            target_z, correction_rule = self.internal_target_z(node)
+            if correction_rule != "Z=MIN":
                 nodes_used_max += 1
-            else:
-                target_z = z_min
-                correction_rule = "Z=MIN"
             
             # Apply correction to ALL entries at this node
             for entry in node['entries']:
@@ -2037,45 +2324,39 @@ class ZCoordinatePlugin(QDialog):
                     fid = entry['fid']
                     
                     # Get layer object
-                    if layer_id not in layers_to_edit:
-                        layer = QgsProject.instance().mapLayer(layer_id)
-                        if layer:
-                            layer.startEditing()
-                            layers_to_edit[layer_id] = layer
-                    
                     layer = layers_to_edit.get(layer_id)
                     if not layer:
                         print(f"WARNING: Could not find layer {layer_id}")
                         continue
                     
-                    # Get feature and update Z
-                    feat = layer.getFeature(fid)
-                    if not feat.isValid():
+                    if fid not in stored_geometries[layer_id]:
                         print(f"WARNING: Invalid feature {fid} in layer {layer.name()}")
                         continue
                     
-                    geom = feat.geometry()
-                    new_geom = self.update_z(geom, x, y, target_z)
-                    layer.changeGeometry(fid, new_geom)
+                    # Only collected here; all updates of a feature are applied together below
+                    z_updates[layer_id][fid][key] = target_z
                     
                     corrections.append({
-                        'layer': layer.name(),
+                        'layer': entry['layer'],
                         'x': x, 'y': y, 'fid': fid,
                         'z_old': entry['z'], 'z_new': target_z
                     })
                     count += 1
                     layer_corrections[layer_id] += 1
-                    layers_affected.add(layer.name())
             
-            if idx % 10 == 0:
-                self.show_progress(True, f"Correcting vertices... ({idx}/{len(self.nodes_csv)})", idx, len(self.nodes_csv))
-                QApplication.processEvents()
+            self.update_progress(f"Correcting vertices... ({idx}/{len(self.nodes_csv)})", idx, len(self.nodes_csv))
         
-        # Commit changes to all affected layers
+        # Correct each feature once with all of its updates, then write all
+        # changes of each layer at once. The report is collected first and
+        # added to the results box in one append.
+        report = []
         for layer_id, layer in layers_to_edit.items():
-            layer.commitChanges()
-            layer.updateExtents()
-            self.correct_results.append(f"✓ Layer '{layer.name()}': {layer_corrections[layer_id]} corrections\n")
+            geometries = stored_geometries[layer_id]
+            self.commit_geometry_changes(layer, {
+                fid: self.update_z_multi(geometries[fid], updates)
+                for fid, updates in z_updates[layer_id].items()
+            })
+            report.append(f"✓ Layer '{layer.name()}': {layer_corrections[layer_id]} corrections\n")
         
         # Store in history
         self.correction_history.append({
@@ -2085,39 +2366,41 @@ class ZCoordinatePlugin(QDialog):
             'count': count
         })
         
-        self.correct_results.append("\n" + "=" * 70 + "\n")
-        self.correct_results.append(f"TOTAL CORRECTIONS: {count}\n")
-        self.correct_results.append(f"Nodes corrected: {len(self.nodes_csv)}\n")
-        self.correct_results.append(f"Layers affected: {len(layers_affected)}\n")
-        self.correct_results.append("=" * 70 + "\n\n")
+        report.append("\n" + "=" * 70 + "\n")
+        report.append(f"TOTAL CORRECTIONS: {count}\n")
+        report.append(f"Nodes corrected: {len(self.nodes_csv)}\n")
+        report.append(f"Layers affected: {len(layer_corrections)}\n")
+        report.append("=" * 70 + "\n\n")
         
-        self.correct_results.append("CORRECTION LOGIC (SMART Z SELECTION):\n")
-        self.correct_results.append("  - Default: Z = MINIMUM value at each node\n")
-        self.correct_results.append("  - Smart rule: If Z_MIN = 0, use Z_MAX instead\n")
-        self.correct_results.append("    (Z=0 often indicates missing/error data)\n")
-        self.correct_results.append("  - Applied across ALL layers\n")
-        self.correct_results.append("  - Ensures internal consistency\n\n")
+        report.append("CORRECTION LOGIC (SMART Z SELECTION):\n")
+        report.append("  - Default: Z = MINIMUM value at each node\n")
+        report.append("  - Smart rule: If Z_MIN = 0, use Z_MAX instead\n")
+        report.append("    (Z=0 often indicates missing/error data)\n")
+        report.append("  - Applied across ALL layers\n")
+        report.append("  - Ensures internal consistency\n\n")
         
         if nodes_used_max > 0:
-            self.correct_results.append(f"SMART RULE APPLIED:\n")
-            self.correct_results.append(f"  {nodes_used_max} node(s) had Z_MIN=0\n")
-            self.correct_results.append(f"  Used Z_MAX instead for these nodes\n\n")
+            report.append(f"SMART RULE APPLIED:\n")
+            report.append(f"  {nodes_used_max} node(s) had Z_MIN=0\n")
+            report.append(f"  Used Z_MAX instead for these nodes\n\n")
         
         # Show sample corrections
         if corrections:
-            self.correct_results.append("Sample corrections (first 15):\n")
-            self.correct_results.append("-" * 70 + "\n")
+            report.append("Sample corrections (first 15):\n")
+            report.append("-" * 70 + "\n")
             for i, c in enumerate(corrections[:15], 1):
-                self.correct_results.append(
+                report.append(
                     f"{i:2d}. [{c['layer']}] ({c['x']:.2f}, {c['y']:.2f}) FID={c['fid']}: "
                     f"{c['z_old']:.3f} → {c['z_new']:.3f}\n"
                 )
         
+        self.correct_results.append("\n".join(report))
+        
         # Update summary
         self.update_correction_summary()
         
         self.show_progress(False)
-        self.update_status(f"✓ Applied {count} corrections across {len(layers_affected)} layers", "success")
+        self.update_status(f"✓ Applied {count} corrections across {len(layer_corrections)} layers", "success")
         
         # Enable verify buttons
         self.quick_verify_btn.setEnabled(True)
@@ -2128,7 +2411,7 @@ class ZCoordinatePlugin(QDialog):
         
         QMessageBox.information(self, "Corrections Complete", 
             f"Applied {count} internal corrections\n\n"
-            f"Layers affected: {len(layers_affected)}\n"
+            f"Layers affected: {len(layer_corrections)}\n"
             f"Nodes corrected: {len(self.nodes_csv)}\n\n"
             f"Correction rule: Z = MINIMUM at each node\n\n"
             "Use 'Quick Verify' to check results")
@@ -2167,27 +2450,68 @@ class ZCoordinatePlugin(QDialog):
         
         self.update_status("Finding intersections between layers...", "processing")
         
-        # Count total comparisons for progress
-        total_comparisons = sum(1 for i in range(len(layers)) for _ in layers[i+1:])
-        self.show_progress(True, "Analyzing intersections...", 0, total_comparisons)
-        
-        all_intersections = []
-        comparison_count = 0
-        
-        # Check each pair of layers
+        # Each layer is read once into its cached spatial index (with stored
+        # geometries) here on the GUI thread. The indexes are only queried on
+        # this thread too; the workers get their own geometry copies
+        self.show_progress(True, "Building spatial indexes...", 0, len(layers))
+        indexes = []
+        for i, layer in enumerate(layers):
+            indexes.append(self.get_spatial_index(layer))
+            self.update_progress("Building spatial indexes...", i + 1, len(layers))
+        
+        # Coarse grid over all layers: a pair whose lines share no grid cell
+        # can't intersect, even if the extents of the two layers overlap
+        full_extent = QgsRectangle(layers[0].extent())
+        for layer in layers[1:]:
+            full_extent.combineExtentWith(layer.extent())
+        grid = (full_extent.xMinimum(), full_extent.yMinimum(),
+                full_extent.width() / 32 or 1.0, full_extent.height() / 32 or 1.0, 32)
+        cells = [self.occupied_cells(index, layer.extent(), grid) for index, layer in zip(indexes, layers)]
+        
+        # Only lines of layer1 inside the common extent of a pair are scanned
+        # (none if the extents don't overlap). Each pair's lines are split into
+        # one chunk per core, so even a single pair keeps all cores busy:
+        # pairs holds (layer1, layer2, range of its scan calls)
+        chunk_count = max(1, QThread.idealThreadCount())
+        pairs = []
+        calls = []
         for i, layer1 in enumerate(layers):
-            for layer2 in layers[i+1:]:
-                self.correct_results.append(f"Checking: {layer1.name()} ↔ {layer2.name()}\n")
-                
-                intersections = self.find_layer_intersections(layer1, layer2)
+            for j in range(i + 1, len(layers)):
+                layer2 = layers[j]
+                overlap = layer1.extent().intersect(layer2.extent())
+                if overlap.isNull() or cells[i].isdisjoint(cells[j]):
+                    fids1 = []
+                else:
+                    fids1 = indexes[i].intersects(overlap)
+                layer_info = {
+                    'layer1_id': layer1.id(),
+                    'layer2_id': layer2.id(),
+                    'layer1_name': layer1.name(),
+                    'layer2_name': layer2.name()
+                }
+                first_call = len(calls)
+                chunk_size = -(-len(fids1) // chunk_count)  # ceiling division
+                for start in range(0, len(fids1), chunk_size or 1):
+                    chunk = fids1[start:start + chunk_size]
+                    candidates = self.worker_candidates(indexes[i], chunk, indexes[j])
+                    calls.append((self.find_layer_intersections, (candidates, layer_info)))
+                pairs.append((layer1, layer2, range(first_call, len(calls))))
+        
+        # The chunks are independent: scan them concurrently on worker threads
+        results = self.run_all_in_background("Analyzing intersections...", calls)
+        
+        # One report line pair per layer pair, added to the results box in one append
+        all_intersections = []
+        scanned_pairs = []  # (layer1, layer2, intersections) of the pairs that intersect
+        pair_report = []
+        for layer1, layer2, pair_calls in pairs:
+            intersections = [intersection for k in pair_calls for intersection in results[k]]
+            pair_report.append(f"Checking: {layer1.name()} ↔ {layer2.name()}\n")
+            pair_report.append(f"  Found {len(intersections)} intersection(s)\n")
+            if intersections:
+                scanned_pairs.append((layer1, layer2, intersections))
                 all_intersections.extend(intersections)
-                
-                self.correct_results.append(f"  Found {len(intersections)} intersection(s)\n")
-                
-                comparison_count += 1
-                self.show_progress(True, f"Analyzing intersections... ({comparison_count}/{total_comparisons})", 
-                                 comparison_count, total_comparisons)
-                QApplication.processEvents()
+        self.correct_results.append("\n".join(pair_report))
         
         if not all_intersections:
             self.correct_results.append("\n✓ No intersections found between layers\n")
@@ -2203,111 +2527,112 @@ class ZCoordinatePlugin(QDialog):
         
         # Apply corrections
         self.correct_results.append("Applying corrections...\n\n")
-        self.show_progress(True, "Applying external corrections...", 0, len(all_intersections))
         
         corrections_made = 0
         vertices_inserted = 0
-        layers_to_commit = set()
-        smart_rule_used = 0  # Track when MAX was used instead of MIN
+        layers_to_commit = {}  # layer_id -> layer object
+        pending_geometries = defaultdict(dict)  # layer_id -> {fid: corrected geometry}
+        smart_points = set()  # Points where MAX was used instead of MIN
+        corrected_points = set()  # Points where at least one line was changed
+        report = []  # correction lines, added to the results box in one append
+        
+        # Each line is corrected once per crossing point, to the target Z chosen
+        # from ALL lines crossing there: a point found by several layer pairs is
+        # not edited twice, nor to a different Z for each pair
+        point_z = {}  # complex(x, y) -> (z_min, z_max) over all lines crossing there
+        line_points = defaultdict(dict)  # (layer_id, fid) -> {complex(x, y): (z, has vertex)}
+        for layer1, layer2, intersections in scanned_pairs:
+            layer1_id, layer2_id = layer1.id(), layer2.id()
+            for intersection in intersections:
+                key = complex(intersection['x'], intersection['y'])
+                z1, z2 = intersection['z1'], intersection['z2']
+                
+                # One comparison orders the pair, no min()/max() calls
+                z_min, z_max = (z1, z2) if z1 <= z2 else (z2, z1)
+                seen = point_z.get(key)
+                if seen is not None:
+                    z_min, z_max = min(z_min, seen[0]), max(z_max, seen[1])
+                point_z[key] = (z_min, z_max)
+                
+                line_points[(layer1_id, intersection['fid1'])][key] = (z1, intersection['vertex1'])
+                line_points[(layer2_id, intersection['fid2'])][key] = (z2, intersection['vertex2'])
         
-        for idx, intersection in enumerate(all_intersections):
-            layer1_id = intersection['layer1_id']
-            layer2_id = intersection['layer2_id']
-            fid1 = intersection['fid1']
-            fid2 = intersection['fid2']
-            x, y = intersection['x'], intersection['y']
-            z1, z2 = intersection['z1'], intersection['z2']
-            
-            # SMART Z SELECTION: If minimum is 0, use maximum instead
-            z_min = min(z1, z2)
-            z_max = max(z1, z2)
-            
+        # SMART Z SELECTION: If minimum is 0, use maximum instead
+        point_targets = {}  # complex(x, y) -> target Z
+        for key, (z_min, z_max) in point_z.items():
             if z_min == 0.0 and z_max != 0.0:
-                target_z = z_max
-                smart_rule_used += 1
+                point_targets[key] = z_max
+                smart_points.add(key)
             else:
-                target_z = z_min
-            
-            # Get layer objects
-            layer1 = QgsProject.instance().mapLayer(layer1_id)
-            layer2 = QgsProject.instance().mapLayer(layer2_id)
+                point_targets[key] = z_min
+        
+        # The history logs the Z actually written at each point, not the pair's own minimum
+        for intersection in all_intersections:
+            intersection['z_new'] = point_targets[complex(intersection['x'], intersection['y'])]
+        
+        # Read all intersecting features with one request per layer
+        layer_fids = defaultdict(set)  # layer_id -> fids
+        for layer_id, fid in line_points:
+            layer_fids[layer_id].add(fid)
+        layers_by_id = {layer.id(): layer for layer in layers}
+        stored_geometries = {
+            layer_id: self.fetch_geometries(layers_by_id[layer_id], fids)
+            for layer_id, fids in layer_fids.items()
+        }
+        layer_names = {layer_id: layer.name() for layer_id, layer in layers_by_id.items()}
+        
+        self.show_progress(True, "Applying external corrections...", 0, len(line_points))
+        
+        for idx, ((layer_id, fid), points) in enumerate(line_points.items(), 1):
+            self.update_progress(f"Applying corrections... ({idx}/{len(line_points)})",
+                                 idx, len(line_points))
             
-            if not layer1 or not layer2:
+            geom = stored_geometries[layer_id].get(fid)
+            if geom is None:
                 continue
-            
-            # Start editing if not already
-            if not layer1.isEditable():
-                layer1.startEditing()
-                layers_to_commit.add(layer1)
-            if not layer2.isEditable():
-                layer2.startEditing()
-                layers_to_commit.add(layer2)
-            
-            # Process layer 1
-            feat1 = layer1.getFeature(fid1)
-            if feat1.isValid():
-                geom1 = feat1.geometry()
-                
-                # Check if vertex exists
-                has_vertex1 = self.has_vertex_at(geom1, x, y)
+            layer_name = layer_names[layer_id]
+            
+            # Z updates of existing vertices and new vertices are collected
+            # first, then applied in one walk and one insertion pass each
+            updates = {}  # complex(x, y) -> target Z of an existing vertex
+            inserts = {}  # complex(x, y) -> Z of a vertex to insert
+            for key, (z, on_vertex) in points.items():
+                target_z = point_targets[key]
                 
-                if has_vertex1:
-                    # Vertex exists - update Z if needed
-                    if z1 != target_z:
-                        new_geom1 = self.update_z(geom1, x, y, target_z)
-                        layer1.changeGeometry(fid1, new_geom1)
-                        corrections_made += 1
-                        self.correct_results.append(
-                            f"  [{layer1.name()}] ({x:.2f}, {y:.2f}): {z1:.3f} → {target_z:.3f}\n"
-                        )
-                else:
-                    # No vertex - insert one
-                    new_geom1 = self.insert_vertex_at_exact_point(geom1, x, y, target_z, tolerance=0)
-                    if new_geom1:
-                        layer1.changeGeometry(fid1, new_geom1)
-                        vertices_inserted += 1
-                        corrections_made += 1
-                        self.correct_results.append(
-                            f"  [{layer1.name()}] ({x:.2f}, {y:.2f}): INSERTED vertex Z={target_z:.3f}\n"
-                        )
-            
-            # Process layer 2
-            feat2 = layer2.getFeature(fid2)
-            if feat2.isValid():
-                geom2 = feat2.geometry()
-                
-                # Check if vertex exists
-                has_vertex2 = self.has_vertex_at(geom2, x, y)
-                
-                if has_vertex2:
-                    # Vertex exists - update Z if needed
-                    if z2 != target_z:
-                        new_geom2 = self.update_z(geom2, x, y, target_z)
-                        layer2.changeGeometry(fid2, new_geom2)
-                        corrections_made += 1
-                        self.correct_results.append(
-                            f"  [{layer2.name()}] ({x:.2f}, {y:.2f}): {z2:.3f} → {target_z:.3f}\n"
-                        )
-                else:
-                    # No vertex - insert one
-                    new_geom2 = self.insert_vertex_at_exact_point(geom2, x, y, target_z, tolerance=0)
-                    if new_geom2:
-                        layer2.changeGeometry(fid2, new_geom2)
-                        vertices_inserted += 1
-                        corrections_made += 1
-                        self.correct_results.append(
-                            f"  [{layer2.name()}] ({x:.2f}, {y:.2f}): INSERTED vertex Z={target_z:.3f}\n"
-                        )
-            
-            if idx % 10 == 0:
-                self.show_progress(True, f"Applying corrections... ({idx}/{len(all_intersections)})", 
-                                 idx, len(all_intersections))
-                QApplication.processEvents()
-        
-        # Commit all changes
-        for layer in layers_to_commit:
-            layer.commitChanges()
-            layer.updateExtents()
+                # Each point occurs once per line, so a vertex there is either
+                # in the original line (found by the scan) or not at all
+                if not on_vertex:
+                    inserts[key] = target_z
+                elif z != target_z:
+                    updates[key] = target_z
+                    corrected_points.add(key)
+                    report.append(f"  [{layer_name}] ({key.real:.2f}, {key.imag:.2f}): {z:.3f} → {target_z:.3f}")
+            
+            corrected = self.update_z_multi(geom, updates) if updates else geom
+            corrections_made += len(updates)
+            if inserts:
+                # No vertex - insert one at each of these points
+                new_geom = self.insert_vertices_at_points(corrected, inserts, tolerance=0)
+                if new_geom:
+                    corrected = new_geom
+                    for key, target_z in inserts.items():
+                        # Points not found on a segment were left out
+                        if self.has_vertex_at(corrected, key.real, key.imag):
+                            vertices_inserted += 1
+                            corrections_made += 1
+                            corrected_points.add(key)
+                            report.append(f"  [{layer_name}] ({key.real:.2f}, {key.imag:.2f}): INSERTED vertex Z={target_z:.3f}")
+            
+            if corrected is not geom:
+                pending_geometries[layer_id][fid] = corrected
+                layers_to_commit[layer_id] = layers_by_id[layer_id]
+        
+        if report:
+            self.correct_results.append("\n".join(report) + "\n")
+        
+        # Write all changes of each layer in one edit session
+        for layer_id, layer in layers_to_commit.items():
+            self.commit_geometry_changes(layer, pending_geometries[layer_id])
         
         # Store in history
         self.correction_history.append({
@@ -2325,6 +2650,9 @@ class ZCoordinatePlugin(QDialog):
         self.correct_results.append(f"Vertices updated: {corrections_made - vertices_inserted}\n")
         self.correct_results.append(f"Layers affected: {len(layers_to_commit)}\n\n")
         
+        # Smart rule counted only where it changed a line
+        smart_rule_used = len(smart_points & corrected_points)
+        
         self.correct_results.append("CORRECTION LOGIC (SMART Z SELECTION):\n")
         self.correct_results.append("  - Default: Z = LOWER value at intersection\n")
         self.correct_results.append("  - Smart rule: If Z_MIN = 0, use Z_MAX instead\n")
@@ -2332,8 +2660,8 @@ class ZCoordinatePlugin(QDialog):
         
         if smart_rule_used > 0:
             self.correct_results.append(f"SMART RULE APPLIED:\n")
-            self.correct_results.append(f"  {smart_rule_used} intersection(s) had Z_MIN=0\n")
-            self.correct_results.append(f"  Used Z_MAX instead for these intersections\n\n")
+            self.correct_results.append(f"  {smart_rule_used} corrected intersection point(s) had Z_MIN=0\n")
+            self.correct_results.append(f"  Used Z_MAX instead at these points\n\n")
         
         self.update_correction_summary()
         self.show_progress(False)
@@ -2353,41 +2681,58 @@ class ZCoordinatePlugin(QDialog):
             f"Correction logic:\n"
             f"• Default: Z = LOWER value\n"
             f"• If Z_MIN = 0: Z = HIGHER value\n"
-            + (f"\n{smart_rule_used} intersection(s) used smart rule (Z_MIN was 0)" if smart_rule_used > 0 else ""))
+            + (f"\n{smart_rule_used} corrected intersection point(s) used smart rule (Z_MIN was 0)" if smart_rule_used > 0 else ""))
     
-    def find_layer_intersections(self, layer1, layer2):
+    def occupied_cells(self, index, extent, grid):
+        """
+        Numbers of the cells of a coarse grid (x0, y0, cell width, cell height,
+        cells per side) touched by the bounding box of any line of the indexed
+        layer (lines within extent). Two layers without a common cell can't cross.
         """
-        Find intersection points between two layers.
-        Returns list of intersections with Z values from both lines.
+        x0, y0, cell_width, cell_height, n = grid
+        cells = set()
+        for fid in index.intersects(extent):
+            box = index.geometry(fid).boundingBox()
+            ix1 = min(n - 1, max(0, int((box.xMinimum() - x0) / cell_width)))
+            ix2 = min(n - 1, max(0, int((box.xMaximum() - x0) / cell_width)))
+            iy1 = min(n - 1, max(0, int((box.yMinimum() - y0) / cell_height)))
+            iy2 = min(n - 1, max(0, int((box.yMaximum() - y0) / cell_height)))
+            for ix in range(ix1, ix2 + 1):
+                cells.update(range(ix * n + iy1, ix * n + iy2 + 1))
+        return cells
+    
+    def find_layer_intersections(self, candidates, layer_info):
+        """
+        Find intersection points between the lines of one layer and the lines
+        of another, given candidate pairs from worker_candidates().
+        Returns list of intersections with Z values from both lines, each
+        including layer_info (ids and names of both layers).
+        Runs on a worker thread: only its own geometry copies are read,
+        never the layers or the shared spatial indexes.
         """
         intersections = []
         tolerance = 0  # Exact matching
         
-        for feat1 in layer1.getFeatures():
-            geom1 = feat1.geometry()
-            if geom1.isEmpty():
-                continue
+        for fid1, geom1, pairs in candidates:
+            engine1 = None  # geom1 prepared for repeated tests, created on first candidate
             
-            for feat2 in layer2.getFeatures():
-                geom2 = feat2.geometry()
-                if geom2.isEmpty():
-                    continue
-                
+            # Only layer2 features whose bounding box overlaps this line
+            for fid2, geom2 in pairs:
                 # Check if geometries intersect
-                if geom1.intersects(geom2):
-                    intersection_geom = geom1.intersection(geom2)
+                if engine1 is None:
+                    engine1 = self.prepared_engine(geom1)
+                if engine1.intersects(geom2.constGet()):
+                    intersection_geom = QgsGeometry(engine1.intersection(geom2.constGet()))
                     
-                    if intersection_geom.isEmpty():
+                    # Only point crossings count, not overlapping segments
+                    if intersection_geom.isEmpty() or intersection_geom.type() != QgsWkbTypes.PointGeometry:
                         continue
                     
                     # Extract intersection points
-                    points = []
                     if intersection_geom.isMultipart():
-                        if intersection_geom.type() == 0:  # Point type
-                            points = intersection_geom.asMultiPoint()
+                        points = intersection_geom.asMultiPoint()
                     else:
-                        if intersection_geom.type() == 0:  # Point type
-                            points = [intersection_geom.asPoint()]
+                        points = [intersection_geom.asPoint()]
                     
                     # Process each intersection point
                     for pt in points:
@@ -2398,28 +2743,26 @@ class ZCoordinatePlugin(QDialog):
                         z2 = self.get_z_at_exact_point_on_line(geom2, x, y, tolerance)
                         
                         if z1 is not None and z2 is not None:
-                            intersections.append({
-                                'layer1_id': layer1.id(),
-                                'layer2_id': layer2.id(),
-                                'layer1_name': layer1.name(),
-                                'layer2_name': layer2.name(),
-                                'fid1': feat1.id(),
-                                'fid2': feat2.id(),
-                                'x': x,
-                                'y': y,
-                                'z1': z1,
-                                'z2': z2
-                            })
+                            intersections.append(dict(
+                                layer_info,
+                                fid1=fid1,
+                                fid2=fid2,
+                                x=x,
+                                y=y,
+                                z1=z1,
+                                z2=z2,
+                                # Whether each line already has a vertex there
+                                vertex1=self.has_vertex_at(geom1, x, y),
+                                vertex2=self.has_vertex_at(geom2, x, y)
+                            ))
         
         return intersections
     
     def has_vertex_at(self, geom, x, y):
         """Check if a vertex exists at exact XY coordinates"""
-        coords = self.parse_wkt(geom.asWkt())
-        for vx, vy, vz in coords:
-            if vx == x and vy == y:
-                return True
-        return False
+        # Native search for the nearest vertex, no coordinate list built in Python
+        sq_dist, _ = geom.closestVertexWithContext(QgsPointXY(x, y))
+        return sq_dist == 0.0
     def detect_contour_issues(self):
         """Detect contour mismatches without applying corrections"""
         layers = self.get_selected_layers()
@@ -2438,7 +2781,7 @@ class ZCoordinatePlugin(QDialog):
         
         self.update_status("Detecting contour mismatches...", "processing")
         
-        contour = QgsVectorLayer(self.paths['contour'], "contour", "ogr")
+        contour = self.get_contour_layer()
         if not contour.isValid():
             QMessageBox.critical(self, "Error", "Cannot load contour file")
             self.update_status("✗ Failed to load contour file", "error")
@@ -2448,56 +2791,36 @@ class ZCoordinatePlugin(QDialog):
         self.contour_results.append(f"Contour features: {contour.featureCount()}\n\n")
         
         all_issues = []
-        total_features = sum(layer.featureCount() for layer in layers)
-        processed = 0
         
-        self.show_progress(True, "Checking contour intersections...", 0, total_features)
+        self.show_progress(True, "Building contour index...", 0, 0)
+        QApplication.processEvents()
+        self.get_spatial_index(contour)
         
+        # The per-layer report is collected and added to the results box in one
+        # append; joining with newlines keeps the layout of separate appends
+        report = []
         for layer in layers:
             layer_name = layer.name()
-            self.contour_results.append(f"\nChecking layer: {layer_name}\n")
-            self.contour_results.append("-" * 70 + "\n")
+            report.append(f"\nChecking layer: {layer_name}\n")
+            report.append("-" * 70 + "\n")
             
-            layer_issues = []
-            
-            for feat in layer.getFeatures():
-                geom = feat.geometry()
-                for cfeat in contour.getFeatures():
-                    cgeom = cfeat.geometry()
-                    if geom.intersects(cgeom):
-                        inter = geom.intersection(cgeom)
-                        pts = [inter.asPoint()] if not inter.isMultipart() else inter.asMultiPoint()
-                        for pt in pts:
-                            z_line = self.get_z(geom, pt.x(), pt.y())
-                            z_cont = self.get_z(cgeom, pt.x(), pt.y())
-                            if z_line and z_cont and abs(z_line - z_cont) > 1e-10:
-                                layer_issues.append({
-                                    'layer': layer_name,
-                                    'fid': feat.id(),
-                                    'x': pt.x(), 'y': pt.y(),
-                                    'z_old': z_line,
-                                    'z_contour': z_cont,
-                                    'diff': abs(z_line - z_cont)
-                                })
-                
-                processed += 1
-                if processed % 50 == 0:
-                    self.show_progress(True, f"Checking contour intersections... ({processed}/{total_features})", processed, total_features)
-                    QApplication.processEvents()
+            layer_issues = self.scan_contour_mismatches(
+                layer, contour, f"Checking contour intersections: {layer_name}..."
+            )
             
             if layer_issues:
-                self.contour_results.append(f"  Found {len(layer_issues)} mismatches\n")
+                report.append(f"  Found {len(layer_issues)} mismatches\n")
                 
                 # Show statistics
                 max_diff = max(issue['diff'] for issue in layer_issues)
                 avg_diff = sum(issue['diff'] for issue in layer_issues) / len(layer_issues)
-                self.contour_results.append(f"  Max difference: {max_diff:.3f}\n")
-                self.contour_results.append(f"  Avg difference: {avg_diff:.3f}\n")
+                report.append(f"  Max difference: {max_diff:.3f}\n")
+                report.append(f"  Avg difference: {avg_diff:.3f}\n")
                 
                 # Show samples
-                self.contour_results.append("\n  Sample mismatches (first 5):\n")
+                report.append("\n  Sample mismatches (first 5):\n")
                 for i, issue in enumerate(layer_issues[:5], 1):
-                    self.contour_results.append(
+                    report.append(
                         f"  {i}. FID={issue['fid']}: ({issue['x']:.2f}, {issue['y']:.2f}) "
                         f"Z={issue['z_old']:.3f} → Contour={issue['z_contour']:.3f} "
                         f"(Δ={issue['diff']:.3f})\n"
@@ -2505,7 +2828,10 @@ class ZCoordinatePlugin(QDialog):
                 
                 all_issues.extend(layer_issues)
             else:
-                self.contour_results.append("  ✓ No mismatches found\n")
+                report.append("  ✓ No mismatches found\n")
+        
+        if report:
+            self.contour_results.append("\n".join(report))
         
         self.show_progress(False)
         
@@ -2526,8 +2852,10 @@ class ZCoordinatePlugin(QDialog):
             self.correct_contour_btn.setEnabled(False)
             self.update_status("✓ No contour mismatches found", "success")
         
-        # Store for later use
+        # Store for later use: apply_contour() reuses them instead of scanning
+        # again, as long as neither the layers nor the contour file changed
         self.detected_contour_issues = all_issues
+        self.contour_issues_key = self.contour_scan_key(layers)
     
     def apply_contour(self):
         """Apply contour corrections (Z = CONTOUR) with progress"""
@@ -2546,72 +2874,63 @@ class ZCoordinatePlugin(QDialog):
         
         self.update_status("Applying contour corrections...", "processing")
         
-        contour = QgsVectorLayer(self.paths['contour'], "contour", "ogr")
+        contour = self.get_contour_layer()
         if not contour.isValid():
             QMessageBox.critical(self, "Error", "Cannot load contour file")
             return
         
         all_corrections = []
-        total_features = sum(layer.featureCount() for layer in layers)
-        processed = 0
         
-        self.show_progress(True, "Applying contour corrections...", 0, total_features)
+        # Mismatches found by the last detection on these layers are used as
+        # they are; the intersection scan only runs if there is none to reuse
+        detected = None
+        if self.contour_issues_key == self.contour_scan_key(layers):
+            detected = defaultdict(list)  # layer_id -> issues
+            for issue in self.detected_contour_issues:
+                detected[issue['layer_id']].append(issue)
         
-        for layer in layers:
+        self.show_progress(True, "Applying contour corrections...", 0, len(layers))
+        
+        # The per-layer report is collected and added to the results box in one
+        # append; joining with newlines keeps the layout of separate appends
+        report = []
+        for idx, layer in enumerate(layers, 1):
             layer_name = layer.name()
-            self.contour_results.append(f"\nProcessing layer: {layer_name}\n")
-            self.contour_results.append("-" * 70 + "\n")
-            
-            issues = []
+            report.append(f"\nProcessing layer: {layer_name}\n")
+            report.append("-" * 70 + "\n")
             
-            # Find issues
-            for feat in layer.getFeatures():
-                geom = feat.geometry()
-                for cfeat in contour.getFeatures():
-                    cgeom = cfeat.geometry()
-                    if geom.intersects(cgeom):
-                        inter = geom.intersection(cgeom)
-                        pts = [inter.asPoint()] if not inter.isMultipart() else inter.asMultiPoint()
-                        for pt in pts:
-                            z_line = self.get_z(geom, pt.x(), pt.y())
-                            z_cont = self.get_z(cgeom, pt.x(), pt.y())
-                            if z_line and z_cont and abs(z_line - z_cont) > 1e-10:
-                                issues.append({
-                                    'layer': layer_name,
-                                    'fid': feat.id(),
-                                    'x': pt.x(), 'y': pt.y(),
-                                    'z_old': z_line,
-                                    'z_contour': z_cont
-                                })
-                
-                processed += 1
-                if processed % 50 == 0:
-                    self.show_progress(True, f"Checking intersections... ({processed}/{total_features})", processed, total_features)
-                    QApplication.processEvents()
+            if detected is not None:
+                issues = detected[layer.id()]
+            else:
+                issues = self.scan_contour_mismatches(
+                    layer, contour, f"Checking contour intersections: {layer_name}..."
+                )
+            self.show_progress(True, f"Applying contour corrections... ({idx}/{len(layers)})", idx, len(layers))
             
             if not issues:
-                self.contour_results.append("  ✓ No corrections needed\n")
+                report.append("  ✓ No corrections needed\n")
                 continue
             
             # Apply corrections
-            self.contour_results.append(f"  Correcting {len(issues)} mismatches...\n")
-            
-            layer.startEditing()
-            for idx, issue in enumerate(issues):
-                feat = layer.getFeature(issue['fid'])
-                geom = feat.geometry()
-                new_geom = self.update_z(geom, issue['x'], issue['y'], issue['z_contour'])
-                layer.changeGeometry(issue['fid'], new_geom)
-            
-            layer.commitChanges()
+            report.append(f"  Correcting {len(issues)} mismatches...\n")
+            
+            # All corrections of a feature are applied to it in one go
+            z_updates = defaultdict(dict)  # fid -> {complex(x, y): contour Z}
+            for issue in issues:
+                z_updates[issue['fid']][complex(issue['x'], issue['y'])] = issue['z_contour']
+            stored = self.fetch_geometries(layer, z_updates.keys())
+            self.commit_geometry_changes(layer, {
+                fid: self.update_z_multi(stored[fid], updates)
+                for fid, updates in z_updates.items() if fid in stored
+            })
             
-            self.contour_results.append(f"  ✓ Applied {len(issues)} corrections\n")
+            report.append(f"  ✓ Applied {len(issues)} corrections\n")
             
             # Show samples
             if issues:
-                self.contour_results.append("\n  Sample corrections (first 5):\n")
+                report.append("\n  Sample corrections (first 5):\n")
                 for i, issue in enumerate(issues[:5], 1):
-                    self.contour_results.append(
+                    report.append(
                         f"  {i}. FID={issue['fid']}: ({issue['x']:.2f}, {issue['y']:.2f}) "
                         f"{issue['z_old']:.3f} → {issue['z_contour']:.3f}\n"
                     )
@@ -2627,6 +2946,9 @@ class ZCoordinatePlugin(QDialog):
                 'count': len(all_corrections)
             })
         
+        if report:
+            self.contour_results.append("\n".join(report))
+        
         self.show_progress(False)
         
         # Summary
@@ -2662,23 +2984,7 @@ class ZCoordinatePlugin(QDialog):
         self.show_progress(True, "Verifying corrections...", 0, 0)
         
         # Check for remaining issues
-        nodes = defaultdict(list)
-        for feat in layer.getFeatures():
-            geom = feat.geometry()
-            if not geom.isEmpty():
-                coords = self.parse_wkt(geom.asWkt())
-                for x, y, z in coords:
-                    if abs(z) > 1e-10:
-                        nodes[(x, y)].append({'fid': feat.id(), 'z': z})
-        
-        remaining_issues = []
-        for (x, y), entries in nodes.items():
-            z_values = [e['z'] for e in entries]
-            if len(set(z_values)) > 1:
-                remaining_issues.append({
-                    'x': x, 'y': y,
-                    'z_values': list(set(z_values))
-                })
+        _, remaining_issues = self.find_z_differences(layer)
         
         self.show_progress(False)
         
@@ -2690,7 +2996,28 @@ class ZCoordinatePlugin(QDialog):
             
             self.update_status(f"⚠ {len(remaining_issues)} issues remain - Correct again", "warning")
             self.correct_remaining_btn.setVisible(True)
-            self.nodes_csv = [{'x': i['x'], 'y': i['y'], 'entries': nodes[(i['x'], i['y'])], 
+            
+            # Collect the vertex entries of the remaining nodes for apply_internal
+            # (one preallocated bucket per issue node: a single dict lookup per vertex)
+            entries = {complex(i['x'], i['y']): [] for i in remaining_issues}
+            layer_name = layer.name()
+            layer_id = layer.id()
+            
+            # Only lines that can touch a remaining node are read again
+            xs = [key.real for key in entries]
+            ys = [key.imag for key in entries]
+            area = QgsRectangle(min(xs), min(ys), max(xs), max(ys))
+            area.grow(1e-6)
+            for feat in layer.getFeatures(QgsFeatureRequest().setNoAttributes().setFilterRect(area)):
+                geom = feat.geometry()
+                if not geom.isEmpty():
+                    fid = feat.id()
+                    for x, y, z in self.geometry_vertices(geom):
+                        bucket = entries.get(complex(x, y))
+                        if bucket is not None and abs(z) > 1e-10:
+                            bucket.append({'layer': layer_name, 'layer_id': layer_id, 'fid': fid, 'z': z})
+            
+            self.nodes_csv = [{'x': i['x'], 'y': i['y'], 'entries': entries[complex(i['x'], i['y'])], 
                              'z_min': min(i['z_values']), 'z_max': max(i['z_values']),
                              'z_diff': max(i['z_values']) - min(i['z_values'])} 
                             for i in remaining_issues]
@@ -2701,6 +3028,102 @@ class ZCoordinatePlugin(QDialog):
             self.correct_remaining_btn.setVisible(False)
             self.verify_btn.setEnabled(True)
     
+    def find_z_differences(self, layer):
+        """
+        Group the vertices of a layer by exact XY and find nodes whose vertices
+        disagree on Z. Returns (total_nodes, issues) with issues as
+        [{'x', 'y', 'z_values'}, ...].
+        """
+        # Each node only keeps the Z of its first vertex; it becomes a set of
+        # Z values only once a different Z shows up (i.e. only for issues)
+        nodes = {}  # complex(x, y) -> z or {z, ...}
+        for feat in layer.getFeatures(QgsFeatureRequest().setNoAttributes()):
+            geom = feat.geometry()
+            if geom.isEmpty():
+                continue
+            
+            for part in geom.constParts():
+                # Parts without Z only have Z = 0 vertices, which are not nodes here
+                if not part.is3D():
+                    continue
+                if isinstance(part, QgsLineString):
+                    # Keys are built column-wise by map(), not one call per vertex
+                    vertices = zip(map(complex, part.xVector(), part.yVector()), part.zVector())
+                else:
+                    vertices = ((complex(v.x(), v.y()), v.z()) for v in part.vertices())
+                
+                for key, z in vertices:
+                    if abs(z) > 1e-10:
+                        seen = nodes.get(key)
+                        if seen is None:
+                            nodes[key] = z
+                        elif isinstance(seen, set):
+                            seen.add(z)
+                        elif seen != z:
+                            nodes[key] = {seen, z}
+        
+        issues = [
+            {'x': key.real, 'y': key.imag, 'z_values': list(z_values)}
+            for key, z_values in nodes.items() if isinstance(z_values, set)
+        ]
+        return len(nodes), issues
+    
+    def scan_contour_mismatches(self, layer, contour, text):
+        """
+        Contour mismatches of the lines of layer, found by find_contour_mismatches().
+        Only lines inside the contour extent can cross a contour; they are split
+        into one chunk per core, scanned concurrently on worker threads. The
+        index queries run here; each chunk gets its own geometry copies.
+        """
+        contour_index = self.get_spatial_index(contour)
+        line_index = self.get_spatial_index(layer)
+        fids = sorted(line_index.intersects(contour.extent()))
+        layer_info = {'layer': layer.name(), 'layer_id': layer.id()}
+        chunk_size = -(-len(fids) // max(1, QThread.idealThreadCount())) or 1  # ceiling division
+        results = self.run_all_in_background(text, [
+            (self.find_contour_mismatches, (
+                self.worker_candidates(line_index, fids[start:start + chunk_size], contour_index), layer_info
+            ))
+            for start in range(0, len(fids), chunk_size)
+        ])
+        return [issue for chunk_issues in results for issue in chunk_issues]
+    
+    def find_contour_mismatches(self, candidates, layer_info):
+        """
+        Find the crossings of lines with the contours where their Z values
+        differ, given (line, contour) candidate pairs from worker_candidates().
+        Returns list of mismatches, each including layer_info (layer name and id).
+        Runs on a worker thread: only its own geometry copies are read,
+        never the layers or the shared spatial indexes.
+        """
+        issues = []
+        # Each contour is tested against many lines: it is prepared once, on first use
+        contour_engines = {}  # contour fid -> prepared engine
+        for fid, geom, pairs in candidates:
+            for cfid, cgeom in pairs:
+                engine = contour_engines.get(cfid)
+                if engine is None:
+                    engine = contour_engines[cfid] = self.prepared_engine(cgeom)
+                if engine.intersects(geom.constGet()):
+                    inter = QgsGeometry(engine.intersection(geom.constGet()))
+                    if inter.type() != QgsWkbTypes.PointGeometry:
+                        continue  # Overlapping segments, no crossing point
+                    pts = [inter.asPoint()] if not inter.isMultipart() else inter.asMultiPoint()
+                    for pt in pts:
+                        x, y = pt.x(), pt.y()
+                        z_line = self.get_z(geom, x, y)
+                        z_cont = self.get_z(cgeom, x, y)
+                        if z_line and z_cont and abs(z_line - z_cont) > 1e-10:
+                            issues.append(dict(
+                                layer_info,
+                                fid=fid,
+                                x=x, y=y,
+                                z_old=z_line,
+                                z_contour=z_cont,
+                                diff=abs(z_line - z_cont)
+                            ))
+        return issues
+    
     def correct_remaining(self):
         """Apply corrections to remaining issues"""
         self.apply_internal()
@@ -2759,32 +3182,19 @@ class ZCoordinatePlugin(QDialog):
         self.verify_results.append("CHECK 1: Internal Node Consistency\n")
         self.verify_results.append("-" * 70 + "\n")
         
-        nodes = defaultdict(list)
-        for feat in layer.getFeatures():
-            geom = feat.geometry()
-            if not geom.isEmpty():
-                coords = self.parse_wkt(geom.asWkt())
-                for x, y, z in coords:
-                    if abs(z) > 1e-10:
-                        nodes[(x, y)].append({'fid': feat.id(), 'z': z})
-        
-        internal_issues = []
-        for (x, y), entries in nodes.items():
-            z_values = [e['z'] for e in entries]
-            if len(set(z_values)) > 1:
-                internal_issues.append({
-                    'x': x, 'y': y,
-                    'z_values': list(set(z_values))
-                })
+        total_nodes, internal_issues = self.find_z_differences(layer)
         
-        self.verify_results.append(f"Total nodes: {len(nodes)}\n")
+        self.verify_results.append(f"Total nodes: {total_nodes}\n")
         self.verify_results.append(f"Nodes with Z differences: {len(internal_issues)}\n")
         
         if internal_issues:
-            self.verify_results.append("\n✗ FAILED - Issues remain\n")
-            self.verify_results.append("\nSample issues:\n")
-            for issue in internal_issues[:5]:
-                self.verify_results.append(f"  ({issue['x']:.2f}, {issue['y']:.2f}): {issue['z_values']}\n")
+            # Added in one append; joining with newlines keeps the layout of separate appends
+            lines = ["\n✗ FAILED - Issues remain\n", "\nSample issues:\n"]
+            lines.extend(
+                f"  ({issue['x']:.2f}, {issue['y']:.2f}): {issue['z_values']}\n"
+                for issue in internal_issues[:5]
+            )
+            self.verify_results.append("\n".join(lines))
         else:
             self.verify_results.append("\n✓ PASSED - All internal nodes match\n")
         
@@ -2795,33 +3205,20 @@ class ZCoordinatePlugin(QDialog):
             self.verify_results.append("CHECK 2: Contour Alignment\n")
             self.verify_results.append("-" * 70 + "\n")
             
-            contour = QgsVectorLayer(self.paths['contour'], "contour", "ogr")
+            contour = self.get_contour_layer()
             if contour.isValid():
-                for feat in layer.getFeatures():
-                    geom = feat.geometry()
-                    for cfeat in contour.getFeatures():
-                        cgeom = cfeat.geometry()
-                        if geom.intersects(cgeom):
-                            inter = geom.intersection(cgeom)
-                            pts = [inter.asPoint()] if not inter.isMultipart() else inter.asMultiPoint()
-                            for pt in pts:
-                                z_line = self.get_z(geom, pt.x(), pt.y())
-                                z_cont = self.get_z(cgeom, pt.x(), pt.y())
-                                if z_line and z_cont and abs(z_line - z_cont) > 1e-10:
-                                    contour_issues.append({
-                                        'x': pt.x(), 'y': pt.y(),
-                                        'z_line': z_line, 'z_contour': z_cont
-                                    })
+                contour_issues = self.scan_contour_mismatches(layer, contour, "Checking contour alignment...")
                 
                 self.verify_results.append(f"Contour intersections with Z differences: {len(contour_issues)}\n")
                 
                 if contour_issues:
-                    self.verify_results.append("\n✗ FAILED - Contour mismatches remain\n")
-                    for issue in contour_issues[:5]:
-                        self.verify_results.append(
-                            f"  ({issue['x']:.2f}, {issue['y']:.2f}): "
-                            f"Line={issue['z_line']:.2f}, Contour={issue['z_contour']:.2f}\n"
-                        )
+                    lines = ["\n✗ FAILED - Contour mismatches remain\n"]
+                    lines.extend(
+                        f"  ({issue['x']:.2f}, {issue['y']:.2f}): "
+                        f"Line={issue['z_old']:.2f}, Contour={issue['z_contour']:.2f}\n"
+                        for issue in contour_issues[:5]
+                    )
+                    self.verify_results.append("\n".join(lines))
                 else:
                     self.verify_results.append("\n✓ PASSED - All contour intersections match\n")
         
@@ -2911,8 +3308,11 @@ class ZCoordinatePlugin(QDialog):
             self.export_results.append(f"CRS: Reprojecting all layers to {export_crs.authid()} - {export_crs.description()}\n\n")
         
         # 1. Export each layer as separate shapefile
-        exported_files = []
-        for idx, layer in enumerate(layers):
+        # Layers are read on this thread into feature-source snapshots; the files
+        # are then written concurrently on worker threads by write_layer_file().
+        transform_context = QgsProject.instance().transformContext()
+        exports = []
+        for layer in layers:
             # Create filename from original layer name
             layer_name = layer.name()
             # Clean filename (remove invalid characters)
@@ -2921,38 +3321,56 @@ class ZCoordinatePlugin(QDialog):
             
             output_file = os.path.join(self.paths['output'], f"{clean_name}_CORRECTED_{timestamp}.shp")
             
-            self.export_results.append(f"Exporting: {layer_name}...\n")
+            messages = [f"Exporting: {layer_name}...\n"]
             
             # Determine CRS for this layer
+            source_crs = layer.crs()
             if use_original_crs:
-                target_crs = layer.crs()
-                self.export_results.append(f"  CRS: {target_crs.authid()}\n")
+                target_crs = source_crs
+                messages.append(f"  CRS: {target_crs.authid()}\n")
             else:
                 target_crs = export_crs
-                if layer.crs() != target_crs:
-                    self.export_results.append(f"  Reprojecting: {layer.crs().authid()} → {target_crs.authid()}\n")
+                if source_crs != target_crs:
+                    messages.append(f"  Reprojecting: {source_crs.authid()} → {target_crs.authid()}\n")
                 else:
-                    self.export_results.append(f"  CRS: {target_crs.authid()} (no reprojection needed)\n")
-            
-            error = QgsVectorFileWriter.writeAsVectorFormat(
-                layer, output_file, "UTF-8", target_crs, "ESRI Shapefile"
-            )
-            
+                    messages.append(f"  CRS: {target_crs.authid()} (no reprojection needed)\n")
+            
+            options = QgsVectorFileWriter.SaveVectorOptions()
+            options.driverName = "ESRI Shapefile"
+            options.fileEncoding = "UTF-8"
+            if target_crs != source_crs:
+                options.ct = QgsCoordinateTransform(source_crs, target_crs, transform_context)
+            
+            exports.append((layer_name, output_file, layer.featureCount(), messages, (
+                QgsVectorLayerFeatureSource(layer), output_file, layer.fields(), layer.wkbType(),
+                target_crs, transform_context, options
+            )))
+        
+        errors = self.run_all_in_background(
+            "Exporting shapefiles...",
+            [(self.write_layer_file, args) for _, _, _, _, args in exports]
+        )
+        
+        # The per-layer report is added to the results box in one append;
+        # joining with newlines keeps the layout of separate appends
+        exported_files = []
+        report = []
+        for (layer_name, output_file, feature_count, messages, _), error in zip(exports, errors):
+            report.extend(messages)
             if error[0] != QgsVectorFileWriter.NoError:
-                self.export_results.append(f"  ✗ FAILED: {error[1]}\n")
+                report.append(f"  ✗ FAILED: {error[1]}\n")
                 continue
             
             exported_files.append({
                 'layer_name': layer_name,
                 'file': output_file,
-                'features': layer.featureCount()
+                'basename': os.path.basename(output_file),  # File name shown in reports
+                'features': feature_count
             })
             
-            self.export_results.append(f"  ✓ Saved: {os.path.basename(output_file)}\n")
-            self.export_results.append(f"  Features: {layer.featureCount()}\n\n")
-            
-            self.show_progress(True, f"Exporting shapefiles... ({idx+1}/{len(layers)})", idx+1, len(layers) + 2)
-            QApplication.processEvents()
+            report.append(f"  ✓ Saved: {exported_files[-1]['basename']}\n")
+            report.append(f"  Features: {feature_count}\n\n")
+        self.export_results.append("\n".join(report))
         
         if not exported_files:
             self.show_progress(False)
@@ -2966,39 +3384,12 @@ class ZCoordinatePlugin(QDialog):
         csv_file = None
         if self.correction_history:
             csv_file = os.path.join(self.paths['output'], f"{base_name}.csv")
-            with open(csv_file, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['Timestamp', 'Type', 'Layer', 'X', 'Y', 'FID', 'Z_Old', 'Z_New'])
-                for entry in self.correction_history:
-                    correction_type = entry['type']
-                    entry_timestamp = entry['timestamp']
-                    
-                    for corr in entry['corrections']:
-                        # Handle different correction formats
-                        if correction_type == 'external':
-                            # External corrections have fid1/fid2, z1/z2
-                            # Write two rows - one for each feature involved
-                            writer.writerow([
-                                entry_timestamp, correction_type,
-                                corr.get('layer1_name', ''),
-                                corr['x'], corr['y'], corr.get('fid1', ''),
-                                corr.get('z1', ''), min(corr.get('z1', 0), corr.get('z2', 0))
-                            ])
-                            writer.writerow([
-                                entry_timestamp, correction_type,
-                                corr.get('layer2_name', ''),
-                                corr['x'], corr['y'], corr.get('fid2', ''),
-                                corr.get('z2', ''), min(corr.get('z1', 0), corr.get('z2', 0))
-                            ])
-                        else:
-                            # Internal/contour corrections have fid, z_old, z_new
-                            writer.writerow([
-                                entry_timestamp, correction_type,
-                                corr.get('layer', ''),
-                                corr['x'], corr['y'], corr.get('fid', ''),
-                                corr.get('z_old', ''), 
-                                corr.get('z_new', corr.get('z_contour', ''))
-                            ])
+            # Write on a worker thread; pass a copy so the history can't change mid-write
+            self.run_in_background(
+                "Generating correction log...",
+                self.write_correction_log,
+                csv_file, list(self.correction_history)
+            )
             self.export_results.append(f"✓ Correction log: {csv_file}\n\n")
         
         self.show_progress(True, "Generating summary report...", len(layers) + 2, len(layers) + 2)
@@ -3006,58 +3397,65 @@ class ZCoordinatePlugin(QDialog):
         # 3. Export summary report (TXT)
         base_name = f"EXPORT_SUMMARY_{timestamp}"
         txt_file = os.path.join(self.paths['output'], f"{base_name}.txt")
+        # Built as one string and written in a single call
+        parts = [
+            "=" * 70 + "\n",
+            "Z-COORDINATE CORRECTION SUMMARY - ALL LAYERS\n",
+            "=" * 70 + "\n\n",
+            f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+        ]
+        
+        # List all exported layers
+        parts.append("EXPORTED LAYERS:\n")
+        parts.append("-" * 70 + "\n")
+        for exp in exported_files:
+            parts.append(f"Layer: {exp['layer_name']}\n")
+            parts.append(f"  File: {exp['basename']}\n")
+            parts.append(f"  Features: {exp['features']}\n\n")
+        parts.append(f"Total layers exported: {len(exported_files)}\n\n")
+        
+        if self.detection_stats:
+            parts.append("DETECTION STATISTICS:\n")
+            parts.append(f"  Total nodes: {self.detection_stats['total_nodes']}\n")
+            parts.append(f"  Problem nodes found: {self.detection_stats['problem_nodes']}\n")
+            parts.append(f"  Detection time: {self.detection_stats['detection_time']:.2f}s\n\n")
+        
+        if self.correction_history:
+            parts.append("CORRECTIONS APPLIED:\n")
+            total = 0
+            for entry in self.correction_history:
+                parts.append(f"  {entry['timestamp']} - {entry['type'].upper()}: {entry['count']}\n")
+                total += entry['count']
+            parts.append(f"  TOTAL: {total} corrections\n\n")
+        
+        # The shapefiles are already listed by name under EXPORTED LAYERS
+        parts.append("FILES GENERATED:\n")
+        parts.append("-" * 70 + "\n")
+        parts.append(f"  • {len(exported_files)} shapefile(s), see EXPORTED LAYERS\n")
+        if self.correction_history:
+            parts.append(f"  • {os.path.basename(csv_file)}\n")
+        parts.append(f"  • {os.path.basename(txt_file)}\n")
+        
         with open(txt_file, 'w') as f:
-            f.write("=" * 70 + "\n")
-            f.write("Z-COORDINATE CORRECTION SUMMARY - ALL LAYERS\n")
-            f.write("=" * 70 + "\n\n")
-            f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            
-            # List all exported layers
-            f.write("EXPORTED LAYERS:\n")
-            f.write("-" * 70 + "\n")
-            for exp in exported_files:
-                f.write(f"Layer: {exp['layer_name']}\n")
-                f.write(f"  File: {os.path.basename(exp['file'])}\n")
-                f.write(f"  Features: {exp['features']}\n\n")
-            f.write(f"Total layers exported: {len(exported_files)}\n\n")
-            
-            if self.detection_stats:
-                f.write("DETECTION STATISTICS:\n")
-                f.write(f"  Total nodes: {self.detection_stats['total_nodes']}\n")
-                f.write(f"  Problem nodes found: {self.detection_stats['problem_nodes']}\n")
-                f.write(f"  Detection time: {self.detection_stats['detection_time']:.2f}s\n\n")
-            
-            if self.correction_history:
-                f.write("CORRECTIONS APPLIED:\n")
-                total = 0
-                for entry in self.correction_history:
-                    f.write(f"  {entry['timestamp']} - {entry['type'].upper()}: {entry['count']}\n")
-                    total += entry['count']
-                f.write(f"  TOTAL: {total} corrections\n\n")
-            
-            f.write("FILES GENERATED:\n")
-            f.write("EXPORTED FILES:\n")
-            f.write("-" * 70 + "\n")
-            for exp in exported_files:
-                f.write(f"  • {os.path.basename(exp['file'])}\n")
-            if self.correction_history:
-                f.write(f"  • {os.path.basename(csv_file)}\n")
-            f.write(f"  • {os.path.basename(txt_file)}\n")
+            f.write("".join(parts))
         
         self.export_results.append(f"✓ Summary report: {txt_file}\n\n")
         
-        self.export_results.append("=" * 70 + "\n")
-        self.export_results.append("EXPORT SUMMARY\n")
-        self.export_results.append("=" * 70 + "\n")
-        self.export_results.append(f"Layers exported: {len(exported_files)}\n")
         total_features = sum(exp['features'] for exp in exported_files)
-        self.export_results.append(f"Total features: {total_features}\n")
+        summary = [
+            "=" * 70 + "\n",
+            "EXPORT SUMMARY\n",
+            "=" * 70 + "\n",
+            f"Layers exported: {len(exported_files)}\n",
+            f"Total features: {total_features}\n"
+        ]
         
         if self.correction_history:
             total_corrections = sum(h['count'] for h in self.correction_history)
-            self.export_results.append(f"Total corrections applied: {total_corrections}\n")
+            summary.append(f"Total corrections applied: {total_corrections}\n")
         
-        self.export_results.append("\n✓ EXPORT COMPLETE\n")
+        summary.append("\n✓ EXPORT COMPLETE\n")
+        self.export_results.append("\n".join(summary))
         
         self.show_progress(False)
         self.update_status(f"✓ Export complete - {len(exported_files)} layers exported", "success")
@@ -3069,9 +3467,10 @@ class ZCoordinatePlugin(QDialog):
             QApplication.processEvents()
             
             added_layers = []
+            added_report = []
             for idx, exp in enumerate(exported_files):
                 layer_path = exp['file']
-                layer_name = os.path.splitext(os.path.basename(layer_path))[0]
+                layer_name = os.path.splitext(exp['basename'])[0]
                 
                 # Load the shapefile as a vector layer
                 vector_layer = QgsVectorLayer(layer_path, layer_name, "ogr")
@@ -3080,19 +3479,20 @@ class ZCoordinatePlugin(QDialog):
                     # Add to project
                     QgsProject.instance().addMapLayer(vector_layer)
                     added_layers.append(layer_name)
-                    self.export_results.append(f"  ✓ Added: {layer_name}\n")
+                    added_report.append(f"  ✓ Added: {layer_name}\n")
                 else:
-                    self.export_results.append(f"  ✗ Failed to add: {layer_name}\n")
+                    added_report.append(f"  ✗ Failed to add: {layer_name}\n")
                 
                 self.show_progress(True, f"Adding layers to map... ({idx+1}/{len(exported_files)})", idx+1, len(exported_files))
                 QApplication.processEvents()
             
             self.show_progress(False)
+            self.export_results.append("\n".join(added_report))
             self.export_results.append(f"\n✓ Added {len(added_layers)} layer(s) to map\n")
             self.update_status(f"✓ Export complete - {len(added_layers)} layers added to map", "success")
         
         # Build file list for message
-        file_list = "\n".join([f"• {os.path.basename(exp['file'])}" for exp in exported_files])
+        file_list = "\n".join([f"• {exp['basename']}" for exp in exported_files])
         
         # Build message based on whether layers were added to map
         message_parts = [
@@ -3109,14 +3509,96 @@ class ZCoordinatePlugin(QDialog):
         
         QMessageBox.information(self, "Export Complete", "".join(message_parts))
     
+    def write_layer_file(self, source, output_file, fields, wkb_type, crs, transform_context, options):
+        """
+        Write a layer snapshot (QgsVectorLayerFeatureSource) to a vector file
+        (runs on a worker thread, no layer access). Features are reprojected
+        with options.ct when it is set. Returns (error code, message) like
+        QgsVectorFileWriter.writeAsVectorFormatV3().
+        """
+        writer = QgsVectorFileWriter.create(output_file, fields, wkb_type, crs, transform_context, options)
+        try:
+            if writer.hasError() != QgsVectorFileWriter.NoError:
+                return writer.hasError(), writer.errorMessage()
+            
+            for feat in source.getFeatures(QgsFeatureRequest()):
+                if options.ct.isValid():
+                    geom = feat.geometry()
+                    geom.transform(options.ct)
+                    feat.setGeometry(geom)
+                writer.addFeature(feat)
+            
+            return writer.hasError(), writer.errorMessage()
+        except QgsCsException as e:
+            # A feature that can't be reprojected fails this layer only, as with writeAsVectorFormatV3()
+            return QgsVectorFileWriter.ErrProjection, str(e)
+        finally:
+            del writer  # Flushes and closes the file
+    
+    def write_correction_log(self, csv_file, history):
+        """Write the correction history to CSV (runs on a worker thread, no layer access)"""
+        with open(csv_file, 'w', newline='', buffering=1 << 20) as f:
+            writer = csv.writer(f)
+            writer.writerow(['Timestamp', 'Type', 'Layer', 'X', 'Y', 'FID', 'Z_Old', 'Z_New'])
+            writer.writerows(self.correction_log_rows(history))
+    
+    def correction_log_rows(self, history):
+        """Yield one CSV row per corrected vertex in the correction history"""
+        for entry in history:
+            correction_type = entry['type']
+            entry_timestamp = entry['timestamp']
+            
+            # Handle different correction formats (checked once per history entry)
+            if correction_type == 'external':
+                # External corrections have fid1/fid2, z1/z2
+                # Write two rows - one for each feature involved
+                for corr in entry['corrections']:
+                    x, y = corr['x'], corr['y']
+                    z_new = corr['z_new']  # Target Z chosen over all lines crossing there
+                    yield [
+                        entry_timestamp, correction_type,
+                        corr.get('layer1_name', ''),
+                        x, y, corr.get('fid1', ''),
+                        corr.get('z1', ''), z_new
+                    ]
+                    yield [
+                        entry_timestamp, correction_type,
+                        corr.get('layer2_name', ''),
+                        x, y, corr.get('fid2', ''),
+                        corr.get('z2', ''), z_new
+                    ]
+            else:
+                # Internal/contour corrections have fid, z_old, z_new
+                for corr in entry['corrections']:
+                    yield [
+                        entry_timestamp, correction_type,
+                        corr.get('layer', ''),
+                        corr['x'], corr['y'], corr.get('fid', ''),
+                        corr.get('z_old', ''), 
+                        corr.get('z_new', corr.get('z_contour', ''))
+                    ]
+    
     # ========== HELPERS ==========
     
-    def parse_wkt(self, wkt):
-        """Extract XYZ from WKT"""
+    def geometry_vertices(self, geom):
+        """Extract XYZ of all vertices straight from the geometry (Z = 0 if missing),
+        as [(x, y, z), ...] in vertex order over all parts.
+        Parts are read through constGet()/constParts(), so nothing is copied; don't modify them."""
+        line = geom.constGet()
+        if isinstance(line, QgsLineString):
+            # Single line (the usual case): one zip over its coordinate vectors
+            return list(zip(line.xVector(), line.yVector(), line.zVector() or [0.0] * line.numPoints()))
+        
         coords = []
-        pattern = r'([-\d.eE]+)\s+([-\d.eE]+)(?:\s+([-\d.eE]+))?'
-        for match in re.findall(pattern, wkt):
-            coords.append((float(match[0]), float(match[1]), float(match[2] or 0)))
+        for part in geom.constParts():
+            if isinstance(part, QgsLineString):
+                z_values = part.zVector() or [0.0] * part.numPoints()
+                coords.extend(zip(part.xVector(), part.yVector(), z_values))
+            elif part.is3D():
+                # Curves, polygons and points are rare here: walk their vertices
+                coords.extend((v.x(), v.y(), v.z()) for v in part.vertices())
+            else:
+                coords.extend((v.x(), v.y(), 0.0) for v in part.vertices())
         return coords
     
     def get_z(self, geom, x, y, tol=1e-6):
@@ -3124,58 +3606,52 @@ class ZCoordinatePlugin(QDialog):
         Get Z at point.
         First tries exact matching at vertices.
         If not found, interpolates Z along the line segment where the point lies.
+        The segment is located natively by closest_segment(), not by a Python scan.
         
         tol: tolerance for considering points as "on" a line segment (default 1e-6)
         """
-        coords = self.parse_wkt(geom.asWkt())
-        
-        # First, try exact match with vertices (no tolerance)
-        for vx, vy, vz in coords:
-            if vx == x and vy == y:
-                return vz
-        
-        # If not an exact vertex match, interpolate along line segments
-        for i in range(len(coords) - 1):
-            x1, y1, z1 = coords[i]
-            x2, y2, z2 = coords[i + 1]
-            
-            # Check if point (x, y) lies on line segment from (x1,y1) to (x2,y2)
-            # Using parametric line equation: P = P1 + t*(P2-P1) where 0 <= t <= 1
-            
-            dx = x2 - x1
-            dy = y2 - y1
-            
-            # Avoid division by zero
-            if abs(dx) < 1e-10 and abs(dy) < 1e-10:
-                continue  # Degenerate segment (same point twice)
-            
-            # Find parameter t
-            if abs(dx) > abs(dy):
-                # Use x-coordinate to find t
-                t = (x - x1) / dx
-            else:
-                # Use y-coordinate to find t
-                t = (y - y1) / dy
-            
-            # Check if t is within valid range [0, 1]
-            if t < -tol or t > 1 + tol:
-                continue
-            
-            # Clamp t to [0, 1]
-            t = max(0.0, min(1.0, t))
-            
-            # Calculate expected point on segment
-            px = x1 + t * dx
-            py = y1 + t * dy
-            
-            # Check if this matches our target point within tolerance
-            dist = math.sqrt((px - x)**2 + (py - y)**2)
-            if dist < tol:
-                # Interpolate Z-value
-                z = z1 + t * (z2 - z1)
-                return z
-        
-        return None
+        segment = self.closest_segment(geom, x, y, tol)
+        if segment is None:
+            return None
+        _, (x1, y1, z1), (x2, y2, z2) = segment
+        
+        # Exact match with a vertex of the segment (no tolerance)
+        if x1 == x and y1 == y:
+            return z1
+        if x2 == x and y2 == y:
+            return z2
+        # Flat segment (or a 2D line): every point on it has the same Z
+        if z1 == z2:
+            return z1
+        
+        # Interpolate Z-value at the position along the segment, clamped to [0, 1]
+        t = max(0.0, min(1.0, self.get_segment_parameter(x, y, x1, y1, x2, y2)))
+        return z1 + t * (z2 - z1)
+    
+    def update_z_multi(self, geom, updates):
+        """
+        Apply several Z updates {complex(x, y): new_z} to one geometry in a single walk
+        over its vertices. Points that are not a vertex yet are passed on to
+        update_z(), which inserts them on their segment.
+        """
+        new_geom = QgsGeometry(geom)
+        remaining = dict(updates)
+        abstract_geom = new_geom.get()
+        if abstract_geom is not None:
+            if not abstract_geom.is3D():
+                abstract_geom.addZValue(0)
+            
+            for part in new_geom.parts():
+                if isinstance(part, QgsLineString):
+                    for i, key in enumerate(map(complex, part.xVector(), part.yVector())):
+                        new_z = updates.get(key)
+                        if new_z is not None:
+                            part.setZAt(i, new_z)
+                            remaining.pop(key, None)
+        
+        for key, new_z in remaining.items():
+            new_geom = self.update_z(new_geom, key.real, key.imag, new_z)
+        return new_geom
     
     def update_z(self, geom, x, y, new_z, tol=1e-6):
         """
@@ -3185,70 +3661,42 @@ class ZCoordinatePlugin(QDialog):
         
         tol: tolerance for considering points as "on" a line segment (default 1e-6)
         """
-        coords = self.parse_wkt(geom.asWkt())
-        new_coords = []
-        updated = False
-        
-        for i, (vx, vy, vz) in enumerate(coords):
-            # Check if this is the exact vertex to update
-            if vx == x and vy == y:
-                new_coords.append((vx, vy, new_z))
-                updated = True
-            else:
-                new_coords.append((vx, vy, vz))
-                
-                # Check if we need to insert a vertex between this one and the next
-                if not updated and i < len(coords) - 1:
-                    x1, y1, z1 = vx, vy, vz
-                    x2, y2, z2 = coords[i + 1]
-                    
-                    dx = x2 - x1
-                    dy = y2 - y1
-                    
-                    # Avoid division by zero
-                    if abs(dx) < 1e-10 and abs(dy) < 1e-10:
-                        continue
-                    
-                    # Find parameter t
-                    if abs(dx) > abs(dy):
-                        t = (x - x1) / dx
-                    else:
-                        t = (y - y1) / dy
-                    
-                    # Check if t is within valid range [0, 1]
-                    if t < -tol or t > 1 + tol:
-                        continue
-                    
-                    # Clamp t to [0, 1]
-                    t = max(0.0, min(1.0, t))
-                    
-                    # Calculate expected point on segment
-                    px = x1 + t * dx
-                    py = y1 + t * dy
-                    
-                    # Check if this matches our target point within tolerance
-                    dist = math.sqrt((px - x)**2 + (py - y)**2)
-                    if dist < tol:
-                        # Insert new vertex at intersection point
-                        new_coords.append((x, y, new_z))
-                        updated = True
-        
-        if not updated:
+        # Fast path: the vertex exists - write its Z in place on a copy of the
+        # geometry (no coordinate list, no WKT rebuild, parts stay as they are)
+        new_geom = QgsGeometry(geom)
+        abstract_geom = new_geom.get()
+        if abstract_geom is not None:
+            if not abstract_geom.is3D():
+                abstract_geom.addZValue(0)
+            
+            updated = False
+            point = QgsPointXY(x, y)
+            for part in new_geom.parts():
+                # Parts whose extent doesn't hold the point can't have it as a vertex
+                if isinstance(part, QgsLineString) and part.boundingBox().contains(point):
+                    for i, (vx, vy) in enumerate(zip(part.xVector(), part.yVector())):
+                        if vx == x and vy == y:
+                            part.setZAt(i, new_z)
+                            updated = True
+            if updated:
+                return new_geom
+        
+        # No vertex at (x, y): insert one on the segment the point lies on, in
+        # place on the same copy (parts kept, no coordinate list or WKT rebuild)
+        segment = self.closest_segment(new_geom, x, y, tol)
+        if segment is None:
             # Debug warning if vertex not found
             print(f"WARNING: update_z could not find vertex or segment for point ({x}, {y})")
-            print(f"  Available vertices: {[(c[0], c[1]) for c in coords[:5]]}...")
-        
-        wkt = geom.asWkt()
-        coord_str = ", ".join([f"{c[0]} {c[1]} {c[2]}" for c in new_coords])
-        if "MULTI" in wkt.upper():
-            new_wkt = f"MULTILINESTRING Z (({coord_str}))"
-        else:
-            new_wkt = f"LINESTRING Z ({coord_str})"
+            return new_geom
         
-        return QgsGeometry.fromWkt(new_wkt)
+        new_geom.insertVertex(QgsPoint(x, y, new_z), segment[0])
+        return new_geom
     
     def unload(self):
         """Cleanup"""
+        # Threads must not be destroyed while they are still running
+        for task in self.running_tasks:
+            task.wait()
         if self.action:
             self.iface.removePluginMenu("Z Tools", self.action)
             self.iface.removeToolBarIcon(self.action)